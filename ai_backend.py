@@ -2,54 +2,387 @@ from google import genai
 import json
 import os
 import ast
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import Future
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # --- NEW SETUP ---
 # We initialize a Client instead of using global config
-client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"))
+# GEMINI_BASE_URL points the client at a local stand-in server for testing
+_base_url = os.environ.get("GEMINI_BASE_URL")
+client = genai.Client(api_key=os.environ.get("GOOGLE_API_KEY"),
+                      http_options={"base_url": _base_url} if _base_url else None)
 
 
-def call_gemini(prompt: str) -> dict:
+MODEL = "gemma-3-4b-it"  # Or "gemini-1.5-flash" if 2.0 isn't available to you yet
+
+# Free-tier requests per minute, per model
+MODEL_QUOTAS = {
+    "gemma-3-4b-it": 30,
+    "gemini-1.5-flash": 15,
+    "gemini-2.0-flash": 15,
+}
+DEFAULT_QUOTA = 15
+RETRY_STATUSES = {429, 503}
+REQUEST_DEADLINE = 30  # Seconds, across all retries
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 16.0
+
+# Plan output format per model. "json" is the original {"steps": [...]} object;
+# "compact" is one short line per step (see parse_compact). Only switch a model
+# to compact once "python prompt_eval.py formats" shows it plans as accurately.
+MODEL_FORMATS = {
+    "gemma-3-4b-it": "json",
+    "gemini-1.5-flash": "json",
+    "gemini-2.0-flash": "json",
+}
+PLAN_FORMATS = ("json", "compact")  # One entry per router.OUTPUT_RULES
+
+
+def _plan_format(value):
+    """Normalizes WINVOICE_PLAN_FORMAT; a typo falls back to JSON instead of breaking startup."""
+    value = (value or "").strip().lower()
+    if not value:
+        return MODEL_FORMATS.get(MODEL, "json")
+    if value not in PLAN_FORMATS:
+        print(f"⚠️ Unknown WINVOICE_PLAN_FORMAT '{value}' (use {' or '.join(PLAN_FORMATS)}), using json.")
+        return "json"
+    return value
+
+
+PLAN_FORMAT = _plan_format(os.environ.get("WINVOICE_PLAN_FORMAT"))
+
+
+class ThrottledError(Exception):
+    """The model stayed rate-limited/unavailable until the deadline ran out."""
+
+
+def _status_code(error):
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(code, int):
+        return code
+    text = str(error)
+    for status in RETRY_STATUSES:
+        if text.startswith(str(status)) or f" {status} " in text:
+            return status
+    return None
+
+
+# --- REQUEST GOVERNOR ---
+class TokenBucket:
+    """Client-side rate limiter. reserve() books the next free slot and says how long to wait for it."""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or max(1, per_minute // 6)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """
+        Returns the wait, or None without taking a token when the wait would be
+        longer than max_wait (so a caller that gives up doesn't delay the rest).
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Negative tokens = callers already queued ahead of us
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+
+class RequestGovernor:
+    """
+    Wraps every model call: token-bucket rate limiting, jittered exponential
+    backoff on 429/503 under an overall deadline, and coalescing so identical
+    prompts already in flight share one call.
+    """
+
+    def __init__(self, per_minute, deadline=REQUEST_DEADLINE):
+        self.bucket = TokenBucket(per_minute)
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.in_flight_async = {}
+        self.stats = {"requests": 0, "calls": 0, "coalesced": 0, "throttled": 0,
+                      "failed": 0, "queue_wait": 0.0}
+
+    def metrics(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["avg_queue_wait"] = stats["queue_wait"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def _backoff(self, attempt, error, deadline):
+        """Returns how long to sleep before retrying, or raises if we shouldn't retry."""
+        status = _status_code(error)
+        if status not in RETRY_STATUSES:
+            raise error
+        self._count("throttled")
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if time.monotonic() + delay > deadline:
+            raise ThrottledError(f"Still getting {status} after {attempt + 1} tries") from error
+        print(f"   🐢 Model returned {status}, retrying in {delay:.1f}s...")
+        return delay
+
+    def _slot(self, deadline):
+        wait = self.bucket.reserve(max_wait=deadline - time.monotonic())
+        if wait is None:
+            raise ThrottledError("Request queue is longer than the deadline")
+        self._count("queue_wait", wait)
+        self._count("calls")
+        return wait
+
+    # --- SYNC ---
+    def call(self, key, fn):
+        self._count("requests")
+        with self.lock:
+            shared = self.in_flight.get(key)
+            if shared is None:
+                shared = self.in_flight[key] = Future()
+                owner = True
+            else:
+                self.stats["coalesced"] += 1
+                owner = False
+        if not owner:
+            return shared.result()
+
+        try:
+            shared.set_result(self._call_with_retry(fn))
+        except BaseException as e:
+            self._count("failed")
+            shared.set_exception(e)
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+        return shared.result()
+
+    def _call_with_retry(self, fn):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            time.sleep(self._slot(deadline))
+            try:
+                return fn()
+            except Exception as e:
+                time.sleep(self._backoff(attempt, e, deadline))
+                attempt += 1
+
+    # --- ASYNC ---
+    async def call_async(self, key, coro_fn):
+        """
+        The shared call runs as its own task that every caller shields, so a
+        cancelled caller never cancels the others; it is cancelled only when
+        the last caller waiting on it goes away.
+        """
+        self._count("requests")
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        shared = self.in_flight_async.get(key)
+        if shared is not None:
+            self._count("coalesced")
+        else:
+            task = loop.create_task(self._call_with_retry_async(coro_fn))
+            shared = self.in_flight_async[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda t: self._finish_async(key, t))
+
+        shared["waiters"] += 1
+        try:
+            return await asyncio.shield(shared["task"])
+        except asyncio.CancelledError:
+            shared["waiters"] -= 1
+            if shared["waiters"] == 0 and not shared["task"].done():
+                # Nobody wants the answer any more; later callers start afresh
+                if self.in_flight_async.get(key) is shared:
+                    self.in_flight_async.pop(key)
+                shared["task"].cancel()
+            raise
+
+    def _finish_async(self, key, task):
+        shared = self.in_flight_async.get(key)
+        if shared is not None and shared["task"] is task:
+            self.in_flight_async.pop(key)
+        if not task.cancelled() and task.exception() is not None:
+            self._count("failed")  # Also marks the exception retrieved when nobody was waiting
+
+    async def _call_with_retry_async(self, coro_fn):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._slot(deadline))
+            try:
+                return await coro_fn()
+            except Exception as e:
+                await asyncio.sleep(self._backoff(attempt, e, deadline))
+                attempt += 1
+
+
+governor = RequestGovernor(MODEL_QUOTAS.get(MODEL, DEFAULT_QUOTA))
+
+
+# --- PLAN PARSING ---
+# Compact format: one step per line, a letter and its value.
+#   U https://www.google.com/search?q=cats   -> OPEN_URL
+#   A notepad                                -> OPEN_APP
+#   W 3                                      -> WAIT
+#   T hello\nworld                           -> TYPE (\n = newline)
+#   P win+printscreen                        -> PRESS
+COMPACT_CODES = {"U": "OPEN_URL", "A": "OPEN_APP", "W": "WAIT", "T": "TYPE", "P": "PRESS"}
+COMPACT_LETTERS = {action: code for code, action in COMPACT_CODES.items()}
+
+
+def _strip_fences(text):
+    if "```" in text:
+        parts = text.split("```")
+        if len(parts) >= 2:
+            text = parts[1]
+            if text.startswith("json"):
+                text = text[4:]
+    return text.strip()
+
+
+def parse_compact(text: str) -> dict:
+    """Strict parser for the compact format. Any line it doesn't understand raises ValueError."""
+    steps = []
+    for line in _strip_fences(text).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        code, _, value = line.partition(" ")
+        action = COMPACT_CODES.get(code)
+        value = value.strip()
+        if action is None or not value:
+            raise ValueError(f"Bad plan line: {line!r}")
+
+        if action == "OPEN_URL":
+            steps.append({"action": action, "url": value})
+        elif action == "OPEN_APP":
+            steps.append({"action": action, "app": value})
+        elif action == "WAIT":
+            steps.append({"action": action, "seconds": float(value)})
+        elif action == "TYPE":
+            steps.append({"action": action, "text": value.replace("\\n", "\n")})
+        else:
+            steps.append({"action": action, "keys": [k.strip().lower() for k in value.split("+") if k.strip()]})
+
+    if not steps:
+        raise ValueError("Empty plan")
+    return {"steps": steps}
+
+
+def format_compact(plan: dict) -> str:
+    """The inverse of parse_compact, used to render prompt examples."""
+    lines = []
+    for step in plan["steps"]:
+        action = step["action"]
+        if action == "OPEN_URL":
+            value = step["url"]
+        elif action == "OPEN_APP":
+            value = step["app"]
+        elif action == "WAIT":
+            value = f"{step['seconds']:g}"
+        elif action == "TYPE":
+            value = step["text"].replace("\n", "\\n")
+        else:
+            value = "+".join(step.get("keys") or [step.get("key")])
+        lines.append(f"{COMPACT_LETTERS[action]} {value}")
+    return "\n".join(lines)
+
+
+def parse_response(text: str, plan_format: str = "json") -> dict:
+    text = text.strip()
+
+    # Compact plans go through the strict parser, unless the model answered in JSON anyway
+    if plan_format == "compact" and not _strip_fences(text).startswith("{"):
+        try:
+            return parse_compact(text)
+        except ValueError:
+            print(f"\n[Raw Invalid Output]: {text}")
+            raise
+
+    # 1. Clean Markdown (Standard fix)
+    text = _strip_fences(text)
+
+    # 2. Extract JSON
+    start_index = text.find("{")
+    end_index = text.rfind("}")
+
+    if start_index != -1 and end_index != -1:
+        text = text[start_index: end_index + 1]
+
+    # 3. Parse
     try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            return ast.literal_eval(text)
+        except:
+            pass
+        print(f"\n[Raw Invalid Output]: {text}")
+        raise
+
+
+# --- MODEL CALLS ---
+def generate_text(prompt: str) -> str:
+    """Raw model output for a prompt, through the governor. Raises ThrottledError."""
+    def generate():
         # New Syntax: client.models.generate_content
         response = client.models.generate_content(
-            model="gemma-3-4b-it",  # Or "gemini-1.5-flash" if 2.0 isn't available to you yet
+            model=MODEL,
             contents=prompt,
             config={
                 "temperature": 0
             }
         )
+        return response.text
 
-        text = response.text.strip()
+    return governor.call((MODEL, prompt), generate)
 
-        # 1. Clean Markdown (Standard fix)
-        if "```" in text:
-            parts = text.split("```")
-            if len(parts) >= 2:
-                text = parts[1]
-                if text.startswith("json"):
-                    text = text[4:]
 
-                    # 2. Extract JSON
-        start_index = text.find("{")
-        end_index = text.rfind("}")
+def call_gemini(prompt: str, plan_format: str = "json") -> dict:
+    try:
+        return parse_response(generate_text(prompt), plan_format)
 
-        if start_index != -1 and end_index != -1:
-            text = text[start_index: end_index + 1]
+    except ThrottledError as e:
+        print(f"\n[AI Throttled]: {e}")
+        return {"error": "rate_limited"}
+    except Exception as e:
+        print(f"\n[AI Error]: {e}")
+        return {}
 
-        # 3. Parse
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            try:
-                return ast.literal_eval(text)
-            except:
-                pass
-            print(f"\n[Raw Invalid Output]: {text}")
-            raise
 
+async def call_gemini_async(prompt: str, plan_format: str = "json") -> dict:
+    """Same as call_gemini, on the async client (no thread blocked while waiting)."""
+    async def generate():
+        response = await client.aio.models.generate_content(
+            model=MODEL,
+            contents=prompt,
+            config={
+                "temperature": 0
+            }
+        )
+        return response.text
+
+    try:
+        return parse_response(await governor.call_async((MODEL, prompt), generate), plan_format)
+
+    except ThrottledError as e:
+        print(f"\n[AI Throttled]: {e}")
+        return {"error": "rate_limited"}
     except Exception as e:
         print(f"\n[AI Error]: {e}")
-        return {}
\ No newline at end of file
+        return {}
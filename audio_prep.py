@@ -0,0 +1,144 @@
+import time
+
+import numpy as np
+
+# --- CONFIGURATION ---
+TARGET_RATE = 16000  # What Google's recognizer works at internally
+FRAME_MS = 20
+TRIM_MARGIN_MS = 200  # Padding kept around speech so word edges aren't clipped
+MIN_SPEECH_RMS = 100
+NOISE_FACTOR = 3.0  # Speech must be this many times louder than the noise floor
+PEAK_TARGET = 0.89  # -1 dBFS
+MAX_GAIN = 10.0
+FIR_TAPS = 63
+
+
+def _to_float(raw, sample_width):
+    if sample_width != 2:
+        return None
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+
+
+def _frame_rms(samples, rate):
+    frame = max(1, int(rate * FRAME_MS / 1000))
+    n = len(samples) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = samples[:n * frame].reshape(n, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1)), frame
+
+
+def trim_silence(samples, rate, threshold=None):
+    """Cuts non-speech off both ends, judged by per-frame energy."""
+    rms, frame = _frame_rms(samples, rate)
+    if len(rms) == 0:
+        return samples
+
+    if threshold is None:
+        noise_floor = float(np.percentile(rms, 10))
+        threshold = max(MIN_SPEECH_RMS, noise_floor * NOISE_FACTOR)
+
+    speech = np.flatnonzero(rms > threshold)
+    if len(speech) == 0:
+        return samples  # Nothing clearly louder than the room; let the recognizer decide
+
+    margin = int(rate * TRIM_MARGIN_MS / 1000)
+    start = max(0, speech[0] * frame - margin)
+    end = min(len(samples), (speech[-1] + 1) * frame + margin)
+    return samples[start:end]
+
+
+def resample(samples, rate, target=TARGET_RATE):
+    """Vectorized resampler: windowed-sinc low-pass (when downsampling) + linear interpolation."""
+    if rate == target or len(samples) == 0:
+        return samples
+
+    if target < rate:
+        cutoff = 0.5 * target / rate
+        n = np.arange(FIR_TAPS) - (FIR_TAPS - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(FIR_TAPS)
+        taps /= taps.sum()
+        samples = np.convolve(samples, taps.astype(np.float32), mode="same")
+
+    n_out = int(len(samples) * target / rate)
+    positions = np.arange(n_out, dtype=np.float64) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def normalize_gain(samples):
+    peak = float(np.max(np.abs(samples))) if len(samples) else 0.0
+    if peak == 0:
+        return samples
+    gain = min(MAX_GAIN, PEAK_TARGET * 32767 / peak)
+    return samples * gain
+
+
+def prepare(raw, sample_rate, sample_width, threshold=None, normalize=False):
+    """
+    Trims, resamples to 16 kHz mono 16-bit and optionally normalizes captured PCM.
+    Returns (raw, sample_rate, sample_width, stats). Formats other than 16-bit
+    are passed through untouched.
+    """
+    t0 = time.perf_counter()
+    stats = {"bytes_before": len(raw), "bytes_after": len(raw), "prep_time": 0.0}
+
+    samples = _to_float(raw, sample_width)
+    if samples is None:
+        return raw, sample_rate, sample_width, stats
+
+    samples = trim_silence(samples, sample_rate, threshold)
+    samples = resample(samples, sample_rate)
+    if normalize:
+        samples = normalize_gain(samples)
+
+    out = np.clip(np.round(samples), -32768, 32767).astype(np.int16).tobytes()
+    stats["bytes_after"] = len(out)
+    stats["prep_time"] = time.perf_counter() - t0
+    return out, TARGET_RATE, 2, stats
+
+
+if __name__ == "__main__":
+    # Corpus report: python audio_prep.py [--upload] clip1.wav clip2.wav ...
+    import sys
+    import wave
+    import speech_recognition as sr
+
+    upload = "--upload" in sys.argv
+    paths = [p for p in sys.argv[1:] if p != "--upload"]
+    r = sr.Recognizer()
+
+    def measure(raw, rate, width):
+        audio = sr.AudioData(raw, rate, width)
+        t0 = time.perf_counter()
+        flac = audio.get_flac_data(convert_width=2)
+        encode = time.perf_counter() - t0
+        total = encode
+        if upload:
+            t0 = time.perf_counter()
+            try:
+                r.recognize_google(audio)
+            except (sr.UnknownValueError, sr.RequestError):
+                pass
+            total = time.perf_counter() - t0  # recognize_google re-encodes, so this is encode + upload
+        return len(flac), encode, total
+
+    sums = np.zeros(6)
+    for path in paths:
+        with wave.open(path, "rb") as w:
+            raw = w.readframes(w.getnframes())
+            rate, width, channels = w.getframerate(), w.getsampwidth(), w.getnchannels()
+        if channels != 1:
+            print(f"{path}: skipped (not mono)")
+            continue
+
+        before = measure(raw, rate, width)
+        new_raw, new_rate, new_width, stats = prepare(raw, rate, width)
+        after = measure(new_raw, new_rate, new_width)
+        sums += np.array(before + after)
+        print(f"{path}: PCM {stats['bytes_before']} -> {stats['bytes_after']} B, "
+              f"FLAC {before[0]} -> {after[0]} B, encode {before[1] * 1000:.0f} -> {after[1] * 1000:.0f} ms"
+              + (f", encode+upload {before[2]:.2f} -> {after[2]:.2f} s" if upload else ""))
+
+    if paths:
+        print(f"TOTAL: FLAC {int(sums[0])} -> {int(sums[3])} B, encode {sums[1]:.2f} -> {sums[4]:.2f} s"
+              + (f", encode+upload {sums[2]:.2f} -> {sums[5]:.2f} s" if upload else ""))
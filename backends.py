@@ -0,0 +1,223 @@
+import os
+import sys
+import time
+import asyncio
+import webbrowser
+import subprocess
+
+# --- CONFIGURATION ---
+DEFAULT_BACKEND = os.environ.get("WINVOICE_BACKEND", "pyautogui")
+BACKEND_CHOSEN = "WINVOICE_BACKEND" in os.environ
+CLIPBOARD_SETTLE = 0.05  # Time the target app gets to read the clipboard before we restore it
+
+
+class ActionBackend:
+    """
+    How plan steps reach the OS. executor.execute_step decides WHAT to do;
+    a backend decides HOW keys, text and launches are injected.
+    """
+    name = "base"
+
+    def open_app(self, app_name):
+        raise NotImplementedError
+
+    def open_url(self, url):
+        webbrowser.open(url)
+
+    def type_text(self, text):
+        raise NotImplementedError
+
+    def press(self, keys):
+        raise NotImplementedError
+
+    def wait(self, seconds):
+        time.sleep(seconds)
+
+    async def wait_async(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+# --- 1. PYAUTOGUI (Default, Windows) ---
+class PyAutoGuiBackend(ActionBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        import pyperclip
+        self.pyautogui = pyautogui
+        self.pyperclip = pyperclip
+
+    def open_app(self, app_name):
+        # Win key opens the menu reliably
+        self.pyautogui.press("win")
+        time.sleep(0.5)
+        self.pyautogui.write(app_name)
+        time.sleep(0.2)
+        self.pyautogui.press("enter")
+
+    def type_text(self, text):
+        self.pyperclip.copy(text)
+        time.sleep(0.2)
+        self.pyautogui.hotkey("ctrl", "v")
+
+    def press(self, keys):
+        # --- FIXED: The Reliable Screenshot Method ---
+        # If the command is strictly "win + printscreen", we handle it manually
+        # to ensure Windows catches the signal.
+        if "win" in keys and "printscreen" in keys:
+            self.pyautogui.keyDown("win")
+            self.pyautogui.press("printscreen")
+            time.sleep(0.1)  # Tiny pause to let OS register
+            self.pyautogui.keyUp("win")
+        else:
+            # For everything else, use standard hotkey
+            self.pyautogui.hotkey(*keys)
+
+
+# --- 2. UINPUT (Linux test rigs, low latency) ---
+class UinputBackend(ActionBackend):
+    """
+    Writes key events straight into a virtual keyboard (/dev/uinput) with no
+    per-call pauses. Text is pasted, and the user's clipboard is put back after.
+    """
+    name = "uinput"
+
+    KEY_NAMES = {
+        "enter": "KEY_ENTER", "return": "KEY_ENTER", "tab": "KEY_TAB", "space": "KEY_SPACE",
+        "esc": "KEY_ESC", "escape": "KEY_ESC", "backspace": "KEY_BACKSPACE", "delete": "KEY_DELETE",
+        "ctrl": "KEY_LEFTCTRL", "control": "KEY_LEFTCTRL", "alt": "KEY_LEFTALT", "shift": "KEY_LEFTSHIFT",
+        "win": "KEY_LEFTMETA", "winleft": "KEY_LEFTMETA", "cmd": "KEY_LEFTMETA",
+        "up": "KEY_UP", "down": "KEY_DOWN", "left": "KEY_LEFT", "right": "KEY_RIGHT",
+        "home": "KEY_HOME", "end": "KEY_END", "pageup": "KEY_PAGEUP", "pagedown": "KEY_PAGEDOWN",
+        "printscreen": "KEY_SYSRQ", "prtsc": "KEY_SYSRQ",
+    }
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("uinput is only available on Linux")
+        from evdev import UInput, ecodes
+        import pyperclip
+
+        self.ecodes = ecodes
+        self.pyperclip = pyperclip
+        self.device = UInput(name="winvoice-keyboard")
+
+    def _code(self, key):
+        key = key.lower()
+        name = self.KEY_NAMES.get(key) or f"KEY_{key.upper()}"
+        code = getattr(self.ecodes, name, None)
+        if code is None:
+            raise ValueError(f"Unknown key: {key}")
+        return code
+
+    def press(self, keys):
+        codes = [self._code(k) for k in keys]
+        for code in codes:
+            self.device.write(self.ecodes.EV_KEY, code, 1)
+        self.device.syn()
+        for code in reversed(codes):
+            self.device.write(self.ecodes.EV_KEY, code, 0)
+        self.device.syn()
+
+    def type_text(self, text):
+        try:
+            saved = self.pyperclip.paste()
+        except Exception:
+            saved = None
+
+        self.pyperclip.copy(text)
+        self.press(["ctrl", "v"])
+        time.sleep(CLIPBOARD_SETTLE)
+
+        if saved is not None:
+            self.pyperclip.copy(saved)
+
+    def open_app(self, app_name):
+        # No Start menu to type into; launch the program directly
+        subprocess.Popen([app_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+
+
+# --- 3. DRY RUN (No side effects) ---
+class DryRunBackend(ActionBackend):
+    """Records what would have happened. WAITs are recorded, not slept."""
+    name = "dry-run"
+
+    def __init__(self):
+        self.actions = []
+
+    def _record(self, action, value):
+        self.actions.append((time.perf_counter(), action, value))
+
+    def open_app(self, app_name):
+        self._record("OPEN_APP", app_name)
+
+    def open_url(self, url):
+        self._record("OPEN_URL", url)
+
+    def type_text(self, text):
+        self._record("TYPE", text)
+
+    def press(self, keys):
+        self._record("PRESS", list(keys))
+
+    def wait(self, seconds):
+        self._record("WAIT", seconds)
+
+    async def wait_async(self, seconds):
+        self._record("WAIT", seconds)
+
+
+BACKENDS = {
+    PyAutoGuiBackend.name: PyAutoGuiBackend,
+    UinputBackend.name: UinputBackend,
+    DryRunBackend.name: DryRunBackend,
+}
+
+
+def create_backend(name=None):
+    """
+    Builds the named backend. Only the implicit default falls back to pyautogui
+    when it can't start here; a backend someone asked for (by name or via
+    WINVOICE_BACKEND) raises instead of sending live keystrokes elsewhere.
+    """
+    explicit = name is not None or BACKEND_CHOSEN
+    name = name or DEFAULT_BACKEND
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        if explicit:
+            raise RuntimeError(f"Unknown backend '{name}' (choose from {', '.join(sorted(BACKENDS))})") from None
+        print(f"   ⚠️ Unknown backend '{name}', using pyautogui.")
+    except Exception as e:
+        if explicit:
+            raise RuntimeError(f"Backend '{name}' unavailable: {e}") from e
+        print(f"   ⚠️ Backend '{name}' unavailable ({e}), using pyautogui.")
+    return PyAutoGuiBackend()
+
+
+if __name__ == "__main__":
+    # Benchmark: python backends.py [--type]
+    # Presses "shift" (harmless) in a loop. --type also pastes text, so focus a scratch window first.
+    N = 50
+    include_type = "--type" in sys.argv
+
+    for name, cls in BACKENDS.items():
+        try:
+            backend = cls()
+        except Exception as e:
+            print(f"{name:>10}: unavailable ({e})")
+            continue
+
+        start = time.perf_counter()
+        for _ in range(N):
+            backend.press(["shift"])
+        press = (time.perf_counter() - start) / N
+        line = f"{name:>10}: {1 / press:8.0f} keys/s, PRESS {press * 1000:7.2f} ms"
+
+        if include_type:
+            start = time.perf_counter()
+            for _ in range(5):
+                backend.type_text("winvoice ")
+            line += f", TYPE {(time.perf_counter() - start) / 5 * 1000:7.2f} ms"
+        print(line)
@@ -0,0 +1,161 @@
+import sys
+import json
+import time
+import asyncio
+import argparse
+import contextlib
+
+# Batch entry point: route (and optionally run) many commands without the GUI.
+#   python batch.py commands.txt -o plans.jsonl
+#   python batch.py commands.txt --no-cache -o after_prompt_change.jsonl
+#   type commands.txt | python batch.py --concurrency 4 --rate 30 --execute --backend dry-run
+#   set WINVOICE_PROFILE=1 && python batch.py commands.txt   (profile written on exit)
+# One command per line; blank lines and lines starting with # are skipped.
+# Results are written as JSONL in the order they finish; "index" is the input line.
+
+DEFAULT_CONCURRENCY = 8
+
+
+def parse_args(argv=None):
+    from backends import BACKENDS
+
+    parser = argparse.ArgumentParser(description="Route WinVoice commands in bulk and write the plans as JSONL.")
+    parser.add_argument("input", nargs="?", default="-", help="File with one command per line (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file to write (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Commands routed at the same time (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--rate", type=int, default=None,
+                        help="Model requests per minute (default: the model's free-tier quota)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Route every command through the model, skipping the plan cache "
+                             "(use this when checking a prompt change)")
+    parser.add_argument("--execute", action="store_true", help="Also execute each plan, one at a time")
+    parser.add_argument("--backend", default="dry-run", choices=sorted(BACKENDS),
+                        help="Backend used with --execute (default: dry-run)")
+    return parser.parse_args(argv)
+
+
+class BatchRunner:
+    def __init__(self, output, concurrency, execute=False):
+        self.output = output
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.execute = execute
+        self.execute_lock = asyncio.Lock()
+        self.done = 0
+        self.failed = 0
+        self.route_time = 0.0
+
+    def _write(self, result):
+        self.output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.output.flush()
+
+    async def _execute(self, plan):
+        from executor import execute_step_async, get_backend
+        from plan_optimizer import optimize_plan
+
+        backend = get_backend()
+        async with self.execute_lock:
+            recorded = len(getattr(backend, "actions", []))
+            start = time.perf_counter()
+            for step in optimize_plan(plan)["steps"]:
+                await execute_step_async(step)
+            elapsed = time.perf_counter() - start
+            actions = [{"action": a, "value": v} for _, a, v in getattr(backend, "actions", [])[recorded:]]
+            if hasattr(backend, "actions"):
+                del backend.actions[recorded:]  # Keep memory flat on long runs
+        return elapsed, actions
+
+    async def _process(self, index, command):
+        from router import route_intent_async
+
+        result = {"index": index, "command": command}
+        try:
+            start = time.perf_counter()
+            plan = await route_intent_async(command)
+            routed = time.perf_counter() - start
+            self.route_time += routed
+            result["route_ms"] = round(routed * 1000, 1)
+            result["plan"] = plan
+
+            if plan.get("error") or not plan.get("steps"):
+                result["error"] = plan.get("error") or "no_plan"
+            elif self.execute:
+                elapsed, actions = await self._execute(plan)
+                result["execute_ms"] = round(elapsed * 1000, 1)
+                if actions:
+                    result["actions"] = actions
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            self.semaphore.release()
+
+        self.done += 1
+        self.failed += "error" in result
+        self._write(result)
+
+    async def run(self, stream):
+        pending = set()
+        index = 0
+        while True:
+            # Read lazily so a huge file (or a slow pipe) never sits in memory
+            line = await asyncio.to_thread(stream.readline)
+            if not line:
+                break
+            index += 1
+            command = line.strip()
+            if not command or command.startswith("#"):
+                continue
+
+            await self.semaphore.acquire()
+            task = asyncio.create_task(self._process(index, command))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+
+    # The router and executor log with print(); keep that out of JSONL on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        import ai_backend
+        import diagnostics  # WINVOICE_PROFILE=1 starts profiling on import
+
+        if args.rate:
+            ai_backend.governor.bucket = ai_backend.TokenBucket(args.rate)
+        if args.no_cache:
+            import router
+            router.USE_PLAN_CACHE = False
+        if args.execute:
+            from executor import set_backend
+            try:
+                set_backend(args.backend)
+            except RuntimeError as e:
+                sys.exit(f"❌ {e}")  # Never fall back to a live backend the user didn't pick
+
+        runner = BatchRunner(output, max(1, args.concurrency), args.execute)
+        start = time.perf_counter()
+        try:
+            asyncio.run(runner.run(stream))
+        except KeyboardInterrupt:
+            print("\n🛑 Interrupted.")
+        elapsed = time.perf_counter() - start
+
+        print(f"\n📦 {runner.done} commands in {elapsed:.1f}s ({runner.failed} failed), "
+              f"avg routing {runner.route_time / max(runner.done, 1):.2f}s")
+        print(f"📊 Model requests: {ai_backend.governor.metrics()}")
+        diagnostics.profiler.stop()  # Write the report here, not on stdout after the JSONL
+
+    if output is not sys.stdout:
+        output.close()
+    if stream is not sys.stdin:
+        stream.close()
+    return 1 if runner.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import time
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# --- CONFIGURATION ---
+CHUNK_FRAMES = 2048  # 4096 bytes of 16-bit mono, same chunk size as voice.listen
+SAMPLE_WIDTH = 2
+RING_SECONDS = 30  # Must stay well above MAX_RECORDING_TIME so finished utterances survive
+PRE_ROLL_SECONDS = 0.3  # Audio kept from just before "start", so the first syllable isn't cut
+SILENCE_HANGOVER = 1.2
+MAX_RECORDING_TIME = 15
+MIN_ENERGY_THRESHOLD = 300
+DEVICE_INDICES = [1, 2, 0, None]  # Same mic priority list as voice.listen
+
+_HEADER = 8  # uint64: total bytes ever written to the ring
+_PA_INPUT_OVERFLOWED = -9981
+
+
+# --- RING BUFFER ---
+class RingBuffer:
+    """
+    PCM ring buffer living in shared memory. The capture process writes; the GUI
+    process reads. Positions are absolute byte counts, so a reader can tell when
+    data it wants has already been overwritten.
+    """
+
+    def __init__(self, shm, size):
+        self.shm = shm
+        self.size = size
+        self.head = np.ndarray((1,), dtype=np.uint64, buffer=shm.buf, offset=0)
+        self.data = np.ndarray((size,), dtype=np.uint8, buffer=shm.buf, offset=_HEADER)
+
+    @property
+    def position(self):
+        return int(self.head[0])
+
+    def write(self, chunk):
+        pos = self.position
+        src = np.frombuffer(chunk, dtype=np.uint8)
+        start = pos % self.size
+        first = min(len(src), self.size - start)
+        self.data[start:start + first] = src[:first]
+        if first < len(src):
+            self.data[:len(src) - first] = src[first:]
+        # Publish the new head only after the bytes are in place
+        self.head[0] = pos + len(src)
+        return pos + len(src)
+
+    def view(self, start, end):
+        """
+        Returns the bytes in [start, end). Zero-copy memoryview unless the range
+        wraps around the end of the ring. Valid until the ring laps it (RING_SECONDS).
+        """
+        start = max(start, end - self.size, 0)
+        s, e = start % self.size, end % self.size
+        if s < e or end == start:
+            return self.shm.buf[_HEADER + s:_HEADER + s + (end - start)]
+        return bytes(self.data[s:]) + bytes(self.data[:e])
+
+
+# --- AUDIO SOURCES ---
+class _MicSource:
+    def __init__(self, device_indices, chunk_frames):
+        import pyaudio
+
+        self.pa = pyaudio.PyAudio()
+        self.overflows = 0
+        for index in device_indices:
+            try:
+                if index is None:
+                    info = self.pa.get_default_input_device_info()
+                else:
+                    info = self.pa.get_device_info_by_index(index)
+                self.rate = int(info["defaultSampleRate"])
+                self.stream = self.pa.open(format=pyaudio.paInt16, channels=1, rate=self.rate,
+                                           input=True, input_device_index=index,
+                                           frames_per_buffer=chunk_frames)
+                self.device = index
+                return
+            except (OSError, IOError):
+                continue
+        raise OSError("No usable microphone found")
+
+    def read(self, frames):
+        try:
+            return self.stream.read(frames, exception_on_overflow=True)
+        except IOError as e:
+            if getattr(e, "errno", None) != _PA_INPUT_OVERFLOWED:
+                raise
+            # The device buffer filled up while we were busy: those frames are gone
+            self.overflows += 1
+            return self.stream.read(frames, exception_on_overflow=False)
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.pa.terminate()
+
+
+class _SyntheticSource:
+    """Real-time noise through a device-sized buffer. Used by the benchmark below."""
+
+    def __init__(self, rate, chunk_frames, buffer_chunks):
+        self.rate = rate
+        self.device = "synthetic"
+        self.chunk_time = chunk_frames / rate
+        self.capacity = buffer_chunks
+        self.started = time.perf_counter()
+        self.produced = 0
+        self.queued = 0
+        self.overflows = 0
+        self.noise = (np.random.default_rng(0).normal(0, 50, chunk_frames)).astype(np.int16).tobytes()
+
+    def read(self, frames):
+        while True:
+            due = int((time.perf_counter() - self.started) / self.chunk_time)
+            if due > self.produced:
+                self.queued += due - self.produced
+                self.produced = due
+                if self.queued > self.capacity:
+                    self.overflows += self.queued - self.capacity
+                    self.queued = self.capacity
+            if self.queued:
+                self.queued -= 1
+                return self.noise
+            time.sleep(self.chunk_time / 4)
+
+    def close(self):
+        pass
+
+
+def _open_source(source_spec):
+    kind, args = source_spec
+    if kind == "synthetic":
+        return _SyntheticSource(*args)
+    return _MicSource(*args)
+
+
+# --- CAPTURE LOOP (runs in the capture process) ---
+def _capture_loop(source, ring, conn, chunk_frames):
+    bytes_per_second = source.rate * SAMPLE_WIDTH
+    ambient = None
+    recording = False
+    start_pos = 0
+    last_speech_pos = 0
+    has_speech_started = False
+    request = None
+
+    while True:
+        # 1. COMMANDS FROM THE GUI PROCESS
+        while conn.poll():
+            cmd = conn.recv()
+            if cmd[0] == "start":
+                request = cmd[1]  # Echoed back, so a late reply is never taken for the next take
+                recording = True
+                has_speech_started = False
+                start_pos = max(0, ring.position - int(PRE_ROLL_SECONDS * bytes_per_second))
+                start_pos -= start_pos % SAMPLE_WIDTH
+                last_speech_pos = ring.position
+            elif cmd[0] == "stop" and recording:
+                recording = False
+                conn.send(("utterance", request, start_pos, ring.position, source.overflows))
+            elif cmd[0] == "quit":
+                conn.send(("stats", source.overflows))
+                return
+
+        # 2. READ AUDIO CHUNK INTO THE RING
+        chunk = source.read(chunk_frames)
+        pos = ring.write(chunk)
+
+        # 3. VAD (RMS energy against a running ambient estimate)
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+        if not recording:
+            ambient = rms if ambient is None else ambient * 0.95 + rms * 0.05
+            continue
+
+        threshold = max(MIN_ENERGY_THRESHOLD, (ambient or 0) * 1.5)
+        if rms > threshold:
+            has_speech_started = True
+            last_speech_pos = pos
+
+        silent_for = (pos - last_speech_pos) / bytes_per_second
+        too_long = (pos - start_pos) / bytes_per_second > MAX_RECORDING_TIME
+        if (has_speech_started and silent_for > SILENCE_HANGOVER) or too_long:
+            recording = False
+            conn.send(("utterance", request, start_pos, pos, source.overflows))
+
+
+def _capture_main(conn, source_spec, chunk_frames):
+    try:
+        source = _open_source(source_spec)
+    except Exception as e:
+        conn.send(("error", str(e)))
+        return
+    try:
+        # The GUI side sizes the ring from the rate reported here
+        conn.send(("ready", source.rate, SAMPLE_WIDTH, source.device))
+        msg = conn.recv()
+        if msg[0] != "ring":
+            return
+        _, shm_name, ring_size = msg
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            _capture_loop(source, RingBuffer(shm, ring_size), conn, chunk_frames)
+        finally:
+            shm.close()
+    finally:
+        source.close()
+
+
+# --- GUI-SIDE HANDLE ---
+class CaptureProcess:
+    """
+    Runs the microphone loop and VAD in a separate process so it never waits on
+    the GUI's GIL. PCM goes through a shared-memory ring; only utterance
+    boundaries cross the pipe.
+    """
+
+    def __init__(self, source_spec=None, chunk_frames=CHUNK_FRAMES):
+        self.source_spec = source_spec or ("mic", (DEVICE_INDICES, chunk_frames))
+        self.chunk_frames = chunk_frames
+        self.ring_size = None
+        self.shm = None
+        self.ring = None
+        self.requests = 0
+        self.process = None
+        self.rate = None
+        self.sample_width = SAMPLE_WIDTH
+        self.overflows = 0
+        self.lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, timeout=10):
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(target=_capture_main, daemon=True,
+                                  args=(child_conn, self.source_spec, self.chunk_frames))
+        self.process.start()
+
+        if not self.conn.poll(timeout):
+            self.close()
+            raise OSError("Capture process did not start")
+        msg = self.conn.recv()
+        if msg[0] != "ready":
+            self.close()
+            raise OSError(f"Capture process failed: {msg[1]}")
+        _, self.rate, self.sample_width, device = msg
+
+        # RING_SECONDS at the real device rate: a 96 kHz mic needs twice the bytes of 48 kHz
+        self.ring_size = RING_SECONDS * self.rate * self.sample_width
+        self.shm = shared_memory.SharedMemory(create=True, size=_HEADER + self.ring_size)
+        self.shm.buf[:_HEADER] = bytes(_HEADER)
+        self.ring = RingBuffer(self.shm, self.ring_size)
+        self.conn.send(("ring", self.shm.name, self.ring_size))
+        print(f"   🎤 Capture process ready (Device {device}, {self.rate} Hz)")
+
+    def record(self, timeout=MAX_RECORDING_TIME + 5):
+        """Records one utterance. Returns a view of its PCM bytes (or None on timeout)."""
+        with self.lock:
+            self.requests += 1
+            request = self.requests
+            self.conn.send(("start", request))
+            deadline = time.monotonic() + timeout
+            stopped = False
+            while True:
+                if not self.conn.poll(max(0.0, deadline - time.monotonic())):
+                    if stopped:
+                        return None
+                    self.conn.send(("stop",))
+                    stopped = True
+                    deadline = time.monotonic() + 2
+                    continue
+                _, answered, start, end, self.overflows = self.conn.recv()
+                if answered == request:
+                    return self.ring.view(start, end)
+                # A reply to an earlier take that timed out: drop it
+
+    def force_stop(self):
+        if self.running:
+            self.conn.send(("stop",))
+
+    def close(self):
+        stats = None
+        if self.running:
+            try:
+                self.conn.send(("quit",))
+                if self.conn.poll(2):
+                    stats = self.conn.recv()
+            except (OSError, EOFError):
+                pass
+            self.process.join(2)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.process = None
+        self.ring = None
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except BufferError:
+                pass  # A caller still holds an utterance view; the OS frees it on exit
+            self.shm.unlink()
+            self.shm = None
+        return stats
+
+
+if __name__ == "__main__":
+    # Stress benchmark: dropped device buffers while the GUI process is busy.
+    # A small 48 kHz buffer (2 x 256 frames ~ 10 ms) makes GIL stalls visible.
+    RATE, FRAMES, BUFFERS, SECONDS, LOAD_THREADS = 48000, 256, 2, 5, 3
+    spec = ("synthetic", (RATE, FRAMES, BUFFERS))
+
+    def busy(stop):
+        # Stand-in for Qt painting + LogicWorker: pure-Python work holding the GIL
+        while not stop.is_set():
+            sum(i * i for i in range(2000))
+
+    def run_load():
+        stop = threading.Event()
+        threads = [threading.Thread(target=busy, args=(stop,), daemon=True) for _ in range(LOAD_THREADS)]
+        for t in threads:
+            t.start()
+        time.sleep(SECONDS)
+        stop.set()
+        for t in threads:
+            t.join()
+
+    # 1. Capture on a thread inside this process
+    shm = shared_memory.SharedMemory(create=True, size=_HEADER + RING_SECONDS * RATE * SAMPLE_WIDTH)
+    ring = RingBuffer(shm, RING_SECONDS * RATE * SAMPLE_WIDTH)
+    parent, child = mp.Pipe()
+    source = _SyntheticSource(RATE, FRAMES, BUFFERS)
+    t = threading.Thread(target=_capture_loop, args=(source, ring, child, FRAMES), daemon=True)
+    t.start()
+    run_load()
+    parent.send(("quit",))
+    t.join()
+    in_process = parent.recv()[1]
+    del ring
+    shm.close()
+    shm.unlink()
+
+    # 2. Capture in its own process
+    cap = CaptureProcess(source_spec=spec, chunk_frames=FRAMES)
+    cap.start()
+    run_load()
+    out_of_process = cap.close()[1]
+
+    total = int(SECONDS * RATE / FRAMES)
+    print(f"Dropped buffers over {SECONDS}s (~{total} buffers, {LOAD_THREADS} busy threads):")
+    print(f"   in-process thread: {in_process}")
+    print(f"   capture process:   {out_of_process}")
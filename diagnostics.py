@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import atexit
+import threading
+import traceback
+import tracemalloc
+from collections import Counter
+
+# --- CONFIGURATION ---
+DIAG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diagnostics")
+PROFILE_AT_START = os.environ.get("WINVOICE_PROFILE") == "1"  # Headless: profile the whole run
+SAMPLE_INTERVAL = 0.005  # 200 samples/s
+TOP_N = 25
+TRACE_DEPTH = 25  # Frames kept per tracemalloc allocation
+
+
+def _path(kind, ext="txt"):
+    os.makedirs(DIAG_DIR, exist_ok=True)
+    now = time.time()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+    return os.path.join(DIAG_DIR, f"{kind}_{stamp}.{ext}")
+
+
+def _thread_names():
+    return {t.ident: t.name for t in threading.enumerate()}
+
+
+def _frame_label(code, lineno):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+
+
+# --- 1. SAMPLING PROFILER ---
+class SamplingProfiler:
+    """
+    Samples every thread's stack from a side thread via sys._current_frames().
+    Unlike cProfile, this covers the Qt thread, the pipeline loop and the
+    capture threads at once, and nothing is hooked into them: when it isn't
+    running it costs nothing, and when it is, the cost is one thread waking
+    SAMPLE_INTERVAL apart.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()  # (thread name, (leaf-last frames...)) -> samples
+        self.samples = 0
+        self.started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self.started = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+        print("   🩺 Profiler started.")
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = _thread_names()
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code, frame.f_lineno))
+                    frame = frame.f_back
+                self.stacks[(names.get(ident, str(ident)), tuple(reversed(stack)))] += 1
+            self.samples += 1
+
+    def stop(self):
+        """Stops sampling and writes the report. Returns the report path."""
+        if not self.running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return self.write_report()
+
+    def write_report(self, top_n=TOP_N):
+        elapsed = time.time() - self.started
+        own, total, per_thread = Counter(), Counter(), Counter()
+        for (thread, stack), count in self.stacks.items():
+            per_thread[thread] += count
+            if stack:
+                own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+
+        path = _path("profile")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"WinVoice profile: {elapsed:.1f}s, {self.samples} samples every {self.interval * 1000:g} ms\n\n")
+            f.write("SAMPLES PER THREAD\n")
+            for thread, count in per_thread.most_common():
+                f.write(f"{count:8d}  {thread}\n")
+            f.write(f"\nTOP {top_n} BY OWN TIME (where threads actually were)\n")
+            for label, count in own.most_common(top_n):
+                f.write(f"{count:8d}  {count / max(self.samples, 1):6.1%}  {label}\n")
+            f.write(f"\nTOP {top_n} BY TOTAL TIME (including callees)\n")
+            for label, count in total.most_common(top_n):
+                f.write(f"{count:8d}  {count / max(self.samples, 1):6.1%}  {label}\n")
+
+        # Collapsed stacks, one per line: feeds flamegraph.pl / speedscope directly
+        with open(path[:-4] + ".folded", "w", encoding="utf-8") as f:
+            for (thread, stack), count in self.stacks.items():
+                f.write(";".join((thread,) + stack) + f" {count}\n")
+
+        print(f"   🩺 Profile written to {path}")
+        return path
+
+
+profiler = SamplingProfiler()
+
+
+# --- 2. MEMORY ---
+_memory_baseline = None
+
+
+def start_memory():
+    """Starts tracemalloc and takes the baseline. Every allocation pays for tracing until stop_memory()."""
+    global _memory_baseline
+    if tracemalloc.is_tracing():
+        return
+    tracemalloc.start(TRACE_DEPTH)
+    _memory_baseline = tracemalloc.take_snapshot()
+    print("   🩺 Memory tracking started.")
+
+
+def memory_snapshot(top_n=TOP_N):
+    """Writes what grew since the previous snapshot. Returns the report path, or None when not tracking."""
+    global _memory_baseline
+    if not tracemalloc.is_tracing():
+        return None
+
+    snapshot = tracemalloc.take_snapshot()
+    stats = snapshot.compare_to(_memory_baseline, "lineno")
+    current, peak = tracemalloc.get_traced_memory()
+
+    path = _path("memory")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Traced memory: {current / 1e6:.1f} MB now, {peak / 1e6:.1f} MB peak\n\n")
+        f.write(f"TOP {top_n} GROWTH SINCE LAST SNAPSHOT\n")
+        for stat in stats[:top_n]:
+            f.write(f"{stat}\n")
+        f.write("\nTOP 5 ALLOCATION TRACEBACKS\n")
+        for stat in snapshot.statistics("traceback")[:5]:
+            f.write(f"\n{stat.size / 1e3:.1f} KB in {stat.count} blocks\n")
+            f.write("\n".join(stat.traceback.format()) + "\n")
+
+    _memory_baseline = snapshot
+    print(f"   🩺 Memory diff written to {path}")
+    return path
+
+
+def stop_memory():
+    """Writes a final diff and stops tracing, so the hot paths are back to full speed."""
+    global _memory_baseline
+    path = memory_snapshot()
+    _memory_baseline = None
+    tracemalloc.stop()
+    if path:
+        print("   🩺 Memory tracking stopped.")
+    return path
+
+
+# --- 3. THREAD DUMP ---
+def dump_threads():
+    """Writes the current stack of every thread (what is stuck where)."""
+    names = _thread_names()
+    path = _path("threads")
+    with open(path, "w", encoding="utf-8") as f:
+        for ident, frame in sys._current_frames().items():
+            f.write(f"--- {names.get(ident, ident)} ({ident}) ---\n")
+            f.write("".join(traceback.format_stack(frame)) + "\n")
+    print(f"   🩺 Thread dump written to {path}")
+    return path
+
+
+if PROFILE_AT_START:
+    profiler.start()
+    atexit.register(profiler.stop)
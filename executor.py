@@ -1,16 +1,32 @@
-import pyautogui
-import time
-import webbrowser
-import pyperclip
+import asyncio
+
+from backends import create_backend
+
+# Created on first use, so importing the executor never touches the display
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap how steps are injected: a backend name ("pyautogui", "uinput", "dry-run") or instance."""
+    global _backend
+    _backend = create_backend(backend) if isinstance(backend, str) else backend
 
 
 def execute_step(step):
     try:
+        backend = get_backend()
         action = step.get("action")
 
         if action == "WAIT":
             print(f"   ⏳ Waiting {step.get('seconds', 1)}s...")
-            time.sleep(step.get("seconds", 1))
+            backend.wait(step.get("seconds", 1))
 
         elif action == "OPEN_APP":
             app_name = step.get("app")
@@ -19,42 +35,32 @@ def execute_step(step):
                 return
 
             print(f"   📱 Opening {app_name}...")
-            # Win key opens the menu reliably
-            pyautogui.press("win")
-            time.sleep(0.5)
-            pyautogui.write(app_name)
-            time.sleep(0.2)
-            pyautogui.press("enter")
+            backend.open_app(app_name)
 
         elif action == "OPEN_URL":
             url = step.get("url")
             if url:
                 print(f"   🌐 Opening: {url}")
-                webbrowser.open(url)
+                backend.open_url(url)
 
         elif action == "TYPE":
             text = step.get("text", "")
             print(f"   📋 Pasting...")
-            pyperclip.copy(text)
-            time.sleep(0.2)
-            pyautogui.hotkey("ctrl", "v")
+            backend.type_text(text)
 
         elif action == "PRESS":
             keys = step.get("keys") or [step.get("key")]
             print(f"   🎹 Pressing: {keys}")
-
-            # --- FIXED: The Reliable Screenshot Method ---
-            # If the command is strictly "win + printscreen", we handle it manually
-            # to ensure Windows catches the signal.
-            if "win" in keys and "printscreen" in keys:
-                pyautogui.keyDown("win")
-                pyautogui.press("printscreen")
-                time.sleep(0.1)  # Tiny pause to let OS register
-                pyautogui.keyUp("win")
-            else:
-                # For everything else, use standard hotkey
-                pyautogui.hotkey(*keys)
-            # ---------------------------------------------
+            backend.press(keys)
 
     except Exception as e:
-        print(f"   ⚠️ Step Failed: {e}")
\ No newline at end of file
+        print(f"   ⚠️ Step Failed: {e}")
+
+
+async def execute_step_async(step):
+    """WAITs sleep on the event loop; input steps are short and run on a worker thread."""
+    if step.get("action") == "WAIT":
+        print(f"   ⏳ Waiting {step.get('seconds', 1)}s...")
+        await get_backend().wait_async(step.get("seconds", 1))
+    else:
+        await asyncio.to_thread(execute_step, step)
@@ -1,17 +1,20 @@
+import os
 import sys
+import time
 import threading
 import math
+import statistics
 import keyboard
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                                QHBoxLayout, QLineEdit, QPushButton, QLabel, QFrame,
                                QGraphicsDropShadowEffect, QSystemTrayIcon, QMenu)
-from PySide6.QtCore import Qt, QTimer, Signal, QThread, QPoint, QRectF, QObject
+from PySide6.QtCore import Qt, QTimer, Signal, QPoint, QRectF, QObject
 from PySide6.QtGui import QColor, QPainter, QPen, QFont, QCursor, QIcon, QPixmap, QAction
 
 # Import backend
-from router import route_intent
-from executor import execute_step
+from pipeline import CommandPipeline
 import voice
+import diagnostics
 
 # --- CONFIGURATION ---
 COLOR_BG = "#1E1E1E"
@@ -19,53 +22,66 @@ COLOR_PILL = "#F5F5F7"
 COLOR_ACCENT = "#89A8C9"
 COLOR_TEXT = "#333333"
 HOTKEY = "ctrl+space"
+WAKE_WORD = os.environ.get("WINVOICE_WAKE_WORD") == "1"
 
 
 # --- HOTKEY BRIDGE ---
 class HotkeyBridge(QObject):
-    summon_signal = Signal()
+    summon_signal = Signal(float)  # perf_counter() when the hotkey fired
 
     def __init__(self):
         super().__init__()
         try:
-            keyboard.add_hotkey(HOTKEY, self.summon_signal.emit)
+            keyboard.add_hotkey(HOTKEY, lambda: self.summon_signal.emit(time.perf_counter()))
         except:
             pass
 
 
-# --- WORKER THREADS ---
-class VoiceWorker(QThread):
-    finished = Signal(str)
-
-    def run(self):
-        text = voice.listen()
-        self.finished.emit(text)
-
-
-class LogicWorker(QThread):
-    finished = Signal()
+# --- FOREGROUND (Windows) ---
+def force_foreground(hwnd):
+    """
+    Windows only lets the app that owns the foreground window hand it over, so a
+    background hotkey app's activateWindow() often just flashes the taskbar.
+    Briefly attaching to the foreground thread's input queue lifts that rule.
+    """
+    if sys.platform != "win32":
+        return
+    import ctypes
+    user32 = ctypes.windll.user32
+    kernel32 = ctypes.windll.kernel32
+
+    foreground = user32.GetForegroundWindow()
+    if foreground == hwnd:
+        return
+    fg_thread = user32.GetWindowThreadProcessId(foreground, None)
+    our_thread = kernel32.GetCurrentThreadId()
+    attached = fg_thread != our_thread and user32.AttachThreadInput(fg_thread, our_thread, True)
+    try:
+        user32.BringWindowToTop(hwnd)
+        user32.SetForegroundWindow(hwnd)
+    finally:
+        if attached:
+            user32.AttachThreadInput(fg_thread, our_thread, False)
+
+
+# --- WAKE WORD BRIDGE ---
+class WakeWordBridge(QObject):
+    detected = Signal()
+    heard = Signal(str)
 
-    def __init__(self, query):
+    def __init__(self):
         super().__init__()
-        self.query = query
-
-    def run(self):
+        self.listener = None
         try:
-            plan = route_intent(self.query)
-            if not plan or "steps" not in plan:
-                voice.speak("I didn't understand.")
-                return
-
-            for step in plan["steps"]:
-                if step['action'] == 'OPEN_APP':
-                    voice.speak(f"Opening {step.get('app', 'app')}")
-                elif step['action'] == 'OPEN_URL':
-                    voice.speak("Opening link")
-                execute_step(step)
+            from wake_word import WakeWordListener
+            self.listener = WakeWordListener(self.detected.emit, self.heard.emit)
+            self.listener.start()
         except Exception as e:
-            print(f"Logic Error: {e}")
-        finally:
-            self.finished.emit()
+            print(f"⚠️ Wake word disabled: {e}")
+
+    def stop(self):
+        if self.listener:
+            self.listener.stop()
 
 
 # --- CUSTOM WIDGET: BREATHING MIC ---
@@ -182,10 +198,30 @@ class MainWindow(QMainWindow):
 
         self.setup_tray()
 
+        # Create the native window now, so summoning only has to show it
+        self.winId()
+        self.summon_started = None
+        self.summon_latencies = []
+        QApplication.instance().focusChanged.connect(self.on_focus_changed)
+
         # Connect the hotkey bridge
         self.hotkey_bridge = HotkeyBridge()
         self.hotkey_bridge.summon_signal.connect(self.summon_window)
 
+        # Optional "Hey WinVoice" listener, alongside the hotkey
+        self.wake_bridge = None
+        if WAKE_WORD:
+            self.wake_bridge = WakeWordBridge()
+            self.wake_bridge.detected.connect(self.on_wake_word)
+            self.wake_bridge.heard.connect(self.on_wake_command)
+
+        # One event-loop thread runs every command (listen -> route -> execute)
+        self.active_commands = set()
+        self.pipeline = CommandPipeline()
+        self.pipeline.heard.connect(self.on_voice_finished)
+        self.pipeline.status.connect(self.on_command_status)
+        self.pipeline.finished.connect(self.on_execution_finished)
+
     def setup_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
         pixmap = QPixmap(64, 64)
@@ -198,48 +234,98 @@ class MainWindow(QMainWindow):
 
         menu = QMenu()
         menu.addAction("Show", self.show_window)
+
+        # Diagnostics for "WinVoice got slow" reports; files go to diagnostics/
+        diag_menu = menu.addMenu("Diagnostics")
+        self.profile_action = diag_menu.addAction("Start Profiling", self.toggle_profiling)
+        self.memory_action = diag_menu.addAction("Start Memory Tracking", self.toggle_memory)
+        self.snapshot_action = diag_menu.addAction("Memory Snapshot",
+                                                   lambda: self.show_diagnostic(diagnostics.memory_snapshot()))
+        self.snapshot_action.setEnabled(False)
+        diag_menu.addAction("Dump Threads", lambda: self.show_diagnostic(diagnostics.dump_threads()))
+        if diagnostics.profiler.running:
+            self.profile_action.setText("Stop Profiling")
+
         menu.addAction("Quit", self.quit_app)
         self.tray_icon.setContextMenu(menu)
         self.tray_icon.show()
         self.tray_icon.activated.connect(self.on_tray_activated)
 
+    def toggle_profiling(self):
+        if diagnostics.profiler.running:
+            self.profile_action.setText("Start Profiling")
+            self.show_diagnostic(diagnostics.profiler.stop())
+        else:
+            diagnostics.profiler.start()
+            self.profile_action.setText("Stop Profiling")
+
+    def toggle_memory(self):
+        # tracemalloc slows every allocation, so it only runs between Start and Stop
+        if self.snapshot_action.isEnabled():
+            self.memory_action.setText("Start Memory Tracking")
+            self.snapshot_action.setEnabled(False)
+            self.show_diagnostic(diagnostics.stop_memory())
+        else:
+            diagnostics.start_memory()
+            self.memory_action.setText("Stop Memory Tracking")
+            self.snapshot_action.setEnabled(True)
+
+    def show_diagnostic(self, path):
+        if path:
+            self.tray_icon.showMessage("WinVoice", f"Saved {os.path.basename(path)} to the diagnostics folder.")
+
     def on_tray_activated(self, reason):
         if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
             self.summon_window()
 
-    def summon_window(self):
+    def summon_window(self, pressed_at=None):
         # We always want to SHOW, never hide when summoned via hotkey
+        self.summon_started = pressed_at or time.perf_counter()
         self.show_window()
+        if self.input_field.hasFocus() and self.isActiveWindow():
+            self.on_focus_changed(None, self.input_field)
 
     def show_window(self):
-        # --- FIXED: NUCLEAR FOCUS METHOD ---
-        # 1. Temporarily enable "Always On Top" to force it above other apps
-        self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
-
-        # 2. Restore if minimized
-        self.showNormal()
+        # The native window already exists and is only hidden, and its flags never
+        # change, so nothing gets re-created here: show it, raise it, focus it.
+        if self.isMinimized():
+            self.showNormal()
         self.show()
         self.raise_()
         self.activateWindow()
-
-        # 3. Focus the input box specifically
+        force_foreground(int(self.winId()))
         self.input_field.setFocus()
 
-        # 4. Remove the "Always On Top" flag after 100ms
-        # If we don't do this, it will stay on top of everything forever.
-        QTimer.singleShot(100, self.remove_always_on_top)
-
-    def remove_always_on_top(self):
-        # Reset to normal behavior so it can go behind other windows again
-        self.setWindowFlags(self.windowFlags() & ~Qt.WindowStaysOnTopHint)
-        self.show()
+    def on_focus_changed(self, old, new):
+        # Hotkey-to-typing latency: from the key press until the input field has focus
+        if new is not self.input_field or self.summon_started is None:
+            return
+        latency = (time.perf_counter() - self.summon_started) * 1000
+        self.summon_started = None
+        self.summon_latencies = self.summon_latencies[-49:] + [latency]
+        print(f"   ⚡ Summoned in {latency:.1f} ms "
+              f"(median {statistics.median(self.summon_latencies):.1f} ms over {len(self.summon_latencies)})")
 
     def closeEvent(self, event):
         event.ignore()
         self.hide()
 
+    def keyPressEvent(self, event):
+        # Esc cancels everything in flight
+        if event.key() == Qt.Key.Key_Escape and self.active_commands:
+            self.pipeline.cancel_all()
+        else:
+            super().keyPressEvent(event)
+
     def quit_app(self):
         self.tray_icon.hide()
+        self.pipeline.shutdown()
+        if self.wake_bridge:
+            self.wake_bridge.stop()
+        if diagnostics.profiler.running:
+            diagnostics.profiler.stop()
+        diagnostics.stop_memory()
+        voice.shutdown()
         QApplication.quit()
 
     # --- LOGIC ---
@@ -251,21 +337,30 @@ class MainWindow(QMainWindow):
             self.status_label.setText("Listening... (Tap to Stop)")
             self.status_label.setStyleSheet("color: #ff5555; font-size: 16px;")
 
-            self.voice_thread = VoiceWorker()
-            self.voice_thread.finished.connect(self.on_voice_finished)
-            self.voice_thread.start()
+            self.active_commands.add(self.pipeline.submit_voice())
         else:
-            voice.force_stop_listening()
+            self.pipeline.stop_listening()
             self.status_label.setText("Finishing...")
             self.status_label.setStyleSheet("color: #ffa500; font-size: 16px;")
 
-    def on_voice_finished(self, text):
+    def on_wake_word(self):
+        self.summon_window()
+        self.mic_view.is_listening = True
+        self.status_label.setText("Listening...")
+        self.status_label.setStyleSheet("color: #ff5555; font-size: 16px;")
+
+    def on_wake_command(self, text):
+        self.mic_view.is_listening = False
+        if not text:
+            self.reset_ui()
+            return
+        self.input_field.setText(text)
+        self.execute_command(text)
+
+    def on_voice_finished(self, cmd_id, text):
         self.mic_view.is_listening = False
         if text:
             self.input_field.setText(text)
-            self.execute_command(text)
-        else:
-            self.reset_ui()
 
     def run_text_command(self):
         text = self.input_field.text()
@@ -273,16 +368,25 @@ class MainWindow(QMainWindow):
         self.execute_command(text)
 
     def execute_command(self, text):
-        self.mic_view.is_processing = True
-        self.status_label.setText("Thinking...")
-        self.status_label.setStyleSheet("color: #ffa500; font-size: 16px;")
+        self.active_commands.add(self.pipeline.submit_text(text))
 
-        self.logic_thread = LogicWorker(text)
-        self.logic_thread.finished.connect(self.on_execution_finished)
-        self.logic_thread.start()
+    def on_command_status(self, cmd_id, status):
+        if status == "thinking":
+            self.mic_view.is_processing = True
+            self.status_label.setText("Thinking...")
+            self.status_label.setStyleSheet("color: #ffa500; font-size: 16px;")
+
+    def on_execution_finished(self, cmd_id, ok):
+        self.active_commands.discard(cmd_id)
+        self.mic_view.is_listening = False
+        if self.active_commands:
+            return  # Another command is still running
 
-    def on_execution_finished(self):
         self.mic_view.is_processing = False
+        if not ok:
+            self.reset_ui()
+            return
+
         self.status_label.setText("Done")
         self.status_label.setStyleSheet("color: #4caf50; font-size: 16px;")
         self.input_field.clear()
@@ -297,11 +401,29 @@ class MainWindow(QMainWindow):
         self.mic_view.update()
 
 
+def benchmark_summon(window, rounds=20):
+    """Hide -> hotkey -> focused input, `rounds` times, then print the spread and quit."""
+    window.summon_latencies = []
+
+    def cycle(remaining):
+        if remaining == 0:
+            lat = sorted(window.summon_latencies)
+            if lat:
+                print(f"Summon latency over {len(lat)} rounds: median {statistics.median(lat):.1f} ms, "
+                      f"p95 {lat[int(len(lat) * 0.95) - 1]:.1f} ms, max {lat[-1]:.1f} ms")
+            window.quit_app()
+            return
+        window.hide()
+        QTimer.singleShot(100, lambda: window.hotkey_bridge.summon_signal.emit(time.perf_counter()))
+        QTimer.singleShot(300, lambda: cycle(remaining - 1))
+
+    QTimer.singleShot(500, lambda: cycle(rounds))
+
+
 if __name__ == "__main__":
     # 1. WINDOWS TASKBAR ICON FIX
     # This tells Windows: "I am a unique app, not just python.exe"
     import ctypes
-    import os
 
     myappid = 'mycompany.winvoice.agent.v1'
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
@@ -322,5 +444,8 @@ if __name__ == "__main__":
     if os.path.exists(icon_path):
         window.setWindowIcon(QIcon(icon_path))
 
-    print("🚀 Agent running in background. Press Ctrl+Space to open.")
+    if "--bench-summon" in sys.argv:
+        benchmark_summon(window)
+    else:
+        print("🚀 Agent running in background. Press Ctrl+Space to open.")
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,175 @@
+import os
+import re
+import sys
+import subprocess
+from importlib import metadata
+
+# Runs before any of our dependencies exist, so this module sticks to the stdlib.
+
+# --- CONFIGURATION ---
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+REQUIREMENTS_FILE = os.path.join(PROJECT_DIR, "requirements.txt")
+DEFAULT_WHEELHOUSE = os.path.join(PROJECT_DIR, "wheelhouse")
+
+_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_COLLECTING_RE = re.compile(r"^\s*(?:Collecting|Requirement already satisfied:)\s+([A-Za-z0-9._-]+)")
+
+
+def _normalize(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def read_requirements(path=REQUIREMENTS_FILE):
+    """Reads requirements.txt (saved as UTF-16 on Windows), skipping blanks and comments."""
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    if raw.startswith((b"\xff\xfe", b"\xfe\xff")):
+        text = raw.decode("utf-16")
+    else:
+        text = raw.decode("utf-8-sig")
+
+    reqs = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            reqs.append(line)
+    return reqs
+
+
+def is_satisfied(requirement):
+    """True if the requirement is already installed at an acceptable version."""
+    match = _NAME_RE.match(requirement)
+    if not match:
+        return False
+
+    try:
+        installed = metadata.version(match.group(1))
+    except metadata.PackageNotFoundError:
+        return False
+
+    spec = requirement[match.end():].strip()
+    if not spec:
+        return True
+
+    try:
+        from packaging.requirements import Requirement
+    except ImportError:
+        try:
+            from pip._vendor.packaging.requirements import Requirement
+        except ImportError:
+            return False  # Can't check the version, let pip decide
+    return Requirement(requirement).specifier.contains(installed, prereleases=True)
+
+
+class InstallEngine:
+    """
+    Installs every missing requirement in a single pip transaction.
+
+    Packages that are already satisfied are skipped entirely, so a re-run on a
+    finished setup doesn't start pip at all. A local wheelhouse (a folder of
+    .whl files) is used as an extra source, or as the only source when offline.
+    """
+
+    def __init__(self, requirements=None, wheelhouse=None, offline=None, cache_dir=None,
+                 on_progress=None):
+        self.requirements = requirements if requirements is not None else read_requirements()
+
+        if wheelhouse is None:
+            wheelhouse = os.environ.get("WINVOICE_WHEELHOUSE")
+        if wheelhouse is None and os.path.isdir(DEFAULT_WHEELHOUSE):
+            wheelhouse = DEFAULT_WHEELHOUSE
+        self.wheelhouse = wheelhouse
+
+        if offline is None:
+            offline = os.environ.get("WINVOICE_OFFLINE") == "1"
+        self.offline = offline
+        self.cache_dir = cache_dir or os.environ.get("WINVOICE_PIP_CACHE")
+
+        # on_progress(percent, message)
+        self.on_progress = on_progress or (lambda percent, message: None)
+        self.failed = []
+
+    def _pip_args(self):
+        args = [sys.executable, "-m", "pip", "install",
+                "--disable-pip-version-check", "--progress-bar", "off"]
+        if self.wheelhouse:
+            args += ["--find-links", self.wheelhouse]
+        if self.offline:
+            args.append("--no-index")
+        if self.cache_dir:
+            args += ["--cache-dir", self.cache_dir]
+        return args
+
+    def _run_pip(self, packages, base, span):
+        """Runs one pip install, mapping its output onto the progress range [base, base + span]."""
+        wanted = {_normalize(_NAME_RE.match(p).group(1)) for p in packages}
+        seen = set()
+
+        proc = subprocess.Popen(self._pip_args() + list(packages),
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, errors="replace")
+        tail = []
+        for line in proc.stdout:
+            line = line.rstrip()
+            tail = (tail + [line])[-20:]
+
+            match = _COLLECTING_RE.match(line)
+            if match:
+                name = _normalize(match.group(1))
+                if name in wanted and name not in seen:
+                    seen.add(name)
+                    # Resolving/downloading is the bulk of the work: first 70% of the span
+                    percent = base + int(span * 0.7 * len(seen) / len(wanted))
+                    self.on_progress(percent, f"Fetching {match.group(1)}...")
+            elif line.startswith("Installing collected packages:"):
+                self.on_progress(base + int(span * 0.8), "Installing packages...")
+            elif line.startswith("Successfully installed"):
+                self.on_progress(base + span, "Installed.")
+
+        proc.wait()
+        return proc.returncode, "\n".join(tail)
+
+    def run(self):
+        """Installs what's missing. Returns True when everything ended up installed."""
+        self.failed = []
+        pending = [r for r in self.requirements if not is_satisfied(r)]
+        if not pending:
+            self.on_progress(100, "All packages already installed.")
+            return True
+
+        self.on_progress(0, f"Installing {len(pending)} packages...")
+        code, output = self._run_pip(pending, 0, 100)
+        if code == 0:
+            self.on_progress(100, "All packages installed.")
+            return True
+
+        # One bad package fails the whole transaction; retry the rest one by one
+        print(f"[Install] Batch install failed:\n{output}")
+        pending = [r for r in pending if not is_satisfied(r)]
+        for i, req in enumerate(pending):
+            base = int(i / len(pending) * 100)
+            code, output = self._run_pip([req], base, int(100 / len(pending)))
+            if code != 0:
+                print(f"[Install] {req} failed:\n{output}")
+                self.failed.append(req)
+
+        self.on_progress(100, "Done." if not self.failed else f"Failed: {', '.join(self.failed)}")
+        return not self.failed
+
+
+def build_wheelhouse(path=DEFAULT_WHEELHOUSE, requirements=None):
+    """Downloads/builds wheels for every requirement so later installs can run offline."""
+    requirements = requirements if requirements is not None else read_requirements()
+    os.makedirs(path, exist_ok=True)
+    return subprocess.call([sys.executable, "-m", "pip", "wheel",
+                            "--disable-pip-version-check", "-w", path] + requirements)
+
+
+if __name__ == "__main__":
+    # "python install_engine.py wheelhouse" pre-fills the offline cache
+    if len(sys.argv) > 1 and sys.argv[1] == "wheelhouse":
+        sys.exit(build_wheelhouse())
+
+    engine = InstallEngine(on_progress=lambda percent, message: print(f"[{percent:3d}%] {message}"))
+    sys.exit(0 if engine.run() else 1)
@@ -8,6 +8,8 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
 from PySide6.QtCore import Qt, QThread, Signal, QTimer
 from PySide6.QtGui import QPixmap, QIcon  # <--- FIXED: Added QIcon here
 
+from install_engine import InstallEngine
+
 # --- CONFIGURATION ---
 ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
 TUTORIAL_IMAGES = [
@@ -22,26 +24,18 @@ class InstallWorker(QThread):
     finished_signal = Signal()
 
     def run(self):
-        # Added pyautogui and pyperclip here as well
-        packages = [
-            "google-genai", "python-dotenv", "SpeechRecognition",
-            "pyttsx3", "pyaudio", "keyboard", "winshell", "pywin32",
-            "pyautogui", "pyperclip"
-        ]
-
-        total = len(packages)
-        for i, package in enumerate(packages):
-            self.text_signal.emit(f"Installing {package}...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-            except:
-                pass
-
-            progress = int(((i + 1) / total) * 100)
-            self.progress_signal.emit(progress)
+        # Everything missing from requirements.txt goes to pip in one transaction;
+        # packages that are already installed are skipped.
+        engine = InstallEngine(on_progress=self.report)
+        if not engine.run():
+            self.text_signal.emit(f"Could not install: {', '.join(engine.failed)}")
 
         self.finished_signal.emit()
 
+    def report(self, percent, message):
+        self.progress_signal.emit(percent)
+        self.text_signal.emit(message)
+
 
 class ApiTestWorker(QThread):
     result_signal = Signal(bool, str)
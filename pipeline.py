@@ -0,0 +1,135 @@
+import asyncio
+import itertools
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from router import route_intent_async
+from executor import execute_step_async, get_backend
+from plan_optimizer import optimize_plan
+import voice
+
+# --- CONFIGURATION ---
+LISTEN_TIMEOUT = 25
+ROUTE_TIMEOUT = 30
+COMMAND_TIMEOUT = 120
+
+
+class CommandPipeline(QObject):
+    """
+    Runs every command (listen -> route -> execute) as a task on ONE asyncio
+    event-loop thread, instead of two fresh QThreads per command.
+
+    Commands can be in flight at the same time: routing overlaps freely, while
+    execution is serialized so two plans never type into each other. Results
+    come back to the GUI through Qt signals. Every method is safe to call from
+    the GUI thread.
+    """
+    heard = Signal(int, str)  # cmd_id, transcribed text ("" = nothing heard)
+    status = Signal(int, str)  # cmd_id, "thinking" | "executing"
+    finished = Signal(int, bool)  # cmd_id, success
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="CommandPipeline", daemon=True)
+        self.ids = itertools.count(1)
+        self.futures = {}
+        self.thread.start()
+
+        # Warm up the input backend while nobody is waiting on it
+        self._submit(None, self._warm_up())
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.execute_lock = asyncio.Lock()
+        self.loop.run_forever()
+
+    def _submit(self, cmd_id, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if cmd_id is not None:
+            self.futures[cmd_id] = future
+            future.add_done_callback(lambda f: self._on_done(cmd_id, f))
+        return future
+
+    def _on_done(self, cmd_id, future):
+        self.futures.pop(cmd_id, None)
+        if future.cancelled():
+            # A cancelled task may never have started, so report it from here
+            print(f"   🛑 Command {cmd_id} cancelled.")
+            self.finished.emit(cmd_id, False)
+
+    async def _warm_up(self):
+        await asyncio.to_thread(get_backend)
+
+    # --- PUBLIC API (GUI thread) ---
+    def submit_text(self, text):
+        cmd_id = next(self.ids)
+        self._submit(cmd_id, self._guarded(cmd_id, self._run_command(cmd_id, text)))
+        return cmd_id
+
+    def submit_voice(self):
+        cmd_id = next(self.ids)
+        self._submit(cmd_id, self._guarded(cmd_id, self._run_voice(cmd_id)))
+        return cmd_id
+
+    def stop_listening(self):
+        voice.force_stop_listening()
+
+    def cancel(self, cmd_id):
+        future = self.futures.get(cmd_id)
+        if future:
+            future.cancel()
+
+    def cancel_all(self):
+        for future in list(self.futures.values()):
+            future.cancel()
+
+    @property
+    def in_flight(self):
+        return len(self.futures)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(2)
+
+    # --- COMMANDS (event-loop thread) ---
+    async def _guarded(self, cmd_id, coro):
+        ok = False
+        try:
+            ok = await asyncio.wait_for(coro, COMMAND_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"   ⌛ Command {cmd_id} timed out.")
+        except Exception as e:
+            print(f"Logic Error: {e}")
+        self.finished.emit(cmd_id, ok)
+        return ok
+
+    async def _run_voice(self, cmd_id):
+        text = await asyncio.wait_for(voice.listen_async(), LISTEN_TIMEOUT)
+        self.heard.emit(cmd_id, text)
+        if not text:
+            return False
+        return await self._run_command(cmd_id, text)
+
+    async def _run_command(self, cmd_id, text):
+        self.status.emit(cmd_id, "thinking")
+        plan = await asyncio.wait_for(route_intent_async(text), ROUTE_TIMEOUT)
+        if plan.get("error") == "rate_limited":
+            voice.speak("I'm being rate limited. Try again in a moment.")
+            return False
+        if not plan or "steps" not in plan:
+            voice.speak("I didn't understand.")
+            return False
+
+        plan = optimize_plan(plan)
+        async with self.execute_lock:
+            self.status.emit(cmd_id, "executing")
+            for step in plan["steps"]:
+                if step['action'] == 'OPEN_APP':
+                    voice.speak(f"Opening {step.get('app', 'app')}")
+                elif step['action'] == 'OPEN_URL':
+                    voice.speak("Opening link")
+                await execute_step_async(step)
+        return True
@@ -0,0 +1,287 @@
+import re
+import copy
+import time
+import zlib
+import threading
+from urllib.parse import quote
+
+import numpy as np
+
+# --- CONFIGURATION ---
+NGRAM_SIZES = (2, 3, 4)
+VECTOR_DIM = 512
+MATCH_THRESHOLD = 0.82  # Cosine similarity needed before we trust a stored plan
+MAX_ENTRIES = 5000
+
+# Plan fields that can carry a value lifted from the user's words. Not "app":
+# app names go through the router's rules ("paint" -> mspaint), never copied.
+SLOT_FIELDS = ("url", "text")
+SLOT_SEPARATORS = (" ", "+", "%20")
+SLOT_MARK = "\ue000"  # Private-use char, never appears in real plans
+
+# Words that carry no meaning for matching ("search youtube FOR lofi")
+GRAMMAR_WORDS = {
+    "a", "an", "the", "for", "on", "in", "at", "to", "of", "me", "my", "please",
+    "up", "some", "can", "you", "could", "would", "now", "about", "with", "i", "want",
+}
+
+# Different words for the same intent share one form
+SYNONYMS = {
+    "look": "search", "find": "search", "lookup": "search",
+    "launch": "open", "start": "open", "run": "open",
+    "write": "type", "enter": "type",
+}
+
+# Words that decide WHICH plan to use, so they can never become a slot value
+INTENT_WORDS = {
+    "open", "search", "play", "type", "ask", "show", "take", "go", "press", "close",
+    "and", "then", "also", "after", "that",
+    "youtube", "google", "amazon", "spotify", "chatgpt", "gemini", "claude", "perplexity",
+}
+
+# Verbs that say little about WHICH plan is meant. They are left out of the match
+# vector ("youtube lofi music" should still hit "search youtube for lofi"), and an
+# entry with nothing but one of these ("type hello" -> {type}) is never stored.
+GENERIC_VERBS = {"open", "search", "play", "type", "ask", "show", "take", "go", "press", "close"}
+
+_WORD_RE = re.compile(r"[A-Za-z0-9']+")
+
+
+def _words(text):
+    return _WORD_RE.findall(text)
+
+
+def _canonical(word):
+    word = word.lower()
+    return SYNONYMS.get(word, word)
+
+
+def _can_be_slot(word):
+    word = _canonical(word)
+    return word not in GRAMMAR_WORDS and word not in INTENT_WORDS
+
+
+def _ngram_buckets(words):
+    """Hashes the character n-grams of each word into vector buckets (with counts)."""
+    counts = {}
+    for word in words:
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                bucket = zlib.crc32(padded[i:i + n].encode()) % VECTOR_DIM
+                counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def _find_slot(value, words):
+    """
+    Finds the longest run of the user's words that was copied into a plan value,
+    as whole tokens only ("paint" is not a slot in "mspaint").
+    Returns (start, length, separator, word_span) or None.
+    """
+    lowered = value.lower()
+    lower_words = [w.lower() for w in words]
+
+    for size in range(len(words), 0, -1):
+        for i in range(len(words) - size + 1):
+            span = lower_words[i:i + size]
+            if not (_can_be_slot(span[0]) and _can_be_slot(span[-1])):
+                continue
+            for sep in SLOT_SEPARATORS:
+                rendered = sep.join(span)
+                if len(rendered) < 2:
+                    continue
+                match = re.search(rf"(?<![a-z0-9]){re.escape(rendered)}(?![a-z0-9])", lowered)
+                if match:
+                    return match.start(), len(rendered), sep, tuple(span)
+    return None
+
+
+class PlanCache:
+    """
+    Remembers plans for past queries and reuses them for near-identical ones.
+
+    Each stored query is reduced to its "carrier" words (the words that pick the
+    plan, minus any slot value). The carrier, less generic verbs, is hashed into
+    a character n-gram TF-IDF row of a NumPy matrix. A lookup scores every row
+    with one matrix-vector product. When the stored plan copied part of the
+    query (a search term, typed text) that part is a slot and is re-filled
+    from the new query.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, threshold=MATCH_THRESHOLD, candidates=5):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.candidates = candidates
+        # Rows hold squared, normalized TF-IDF weights (each row sums to 1), so
+        # "matrix @ presence" is the share of a stored carrier found in the query.
+        self.matrix = np.zeros((max_entries, VECTOR_DIM), dtype=np.float32)
+        self.last_used = np.zeros(max_entries, dtype=np.float64)
+        self.doc_freq = np.zeros(VECTOR_DIM, dtype=np.float64)
+        self.entries = [None] * max_entries
+        self.size = 0
+        self.lock = threading.Lock()
+
+    # --- VECTORS ---
+    def _row(self, buckets):
+        row = np.zeros(VECTOR_DIM, dtype=np.float32)
+        if not buckets:
+            return row
+        idf = np.log((1.0 + self.size) / (1.0 + self.doc_freq)) + 1.0
+        idx = np.fromiter(buckets.keys(), dtype=np.int64)
+        weights = np.fromiter(buckets.values(), dtype=np.float32) * idf[idx]
+        row[idx] = weights * weights
+        row /= row.sum()
+        return row
+
+    # --- STORE ---
+    def add(self, query, plan):
+        steps = plan.get("steps") if plan else None
+        if not steps:
+            return
+
+        words = _words(query)
+        slots = []
+        templates = []
+        for step_index, step in enumerate(steps):
+            for field in SLOT_FIELDS:
+                value = step.get(field)
+                if not isinstance(value, str):
+                    continue
+                if field == "url" and not value.startswith("http"):
+                    continue  # URI schemes (ms-settings:...) are fixed names, not free text
+                found = _find_slot(value, words)
+                if not found:
+                    continue
+                pos, length, sep, span = found
+                if field == "url" and len(span) == 1:
+                    # One word gives no hint of the joiner; query strings use '+', paths '%20'
+                    sep = "+" if "?" in value[:pos] else "%20"
+                templates.append((step_index, field, value[:pos] + SLOT_MARK + value[pos + length:], sep))
+                if span not in slots:
+                    slots.append(span)
+
+        # Only single-slot plans are safe to re-fill; others are reused verbatim
+        if len(slots) != 1:
+            slots, templates = [], []
+        slot_words = {w for span in slots for w in span}
+        carrier = [_canonical(w) for w in words
+                   if w.lower() not in slot_words and _canonical(w) not in GRAMMAR_WORDS]
+        match_words = [w for w in carrier if w not in GENERIC_VERBS]
+        if not match_words:
+            return  # Only a generic verb left: it would match far too much
+
+        buckets = _ngram_buckets(match_words)
+        entry = {
+            "query": query,
+            "plan": copy.deepcopy(plan),
+            "templates": templates,
+            "carrier": set(carrier),
+            "buckets": tuple(buckets),
+        }
+
+        with self.lock:
+            if self.size < self.max_entries:
+                row = self.size
+                self.size += 1
+            else:
+                # Evict the entry that has gone unused the longest
+                row = int(np.argmin(self.last_used))
+                self.doc_freq[list(self.entries[row]["buckets"])] -= 1
+
+            self.doc_freq[list(buckets)] += 1
+            self.matrix[row] = self._row(buckets)
+            self.last_used[row] = time.monotonic()
+            self.entries[row] = entry
+
+    # --- LOOKUP ---
+    def lookup(self, query):
+        """Returns (plan, confidence). plan is None when nothing is close enough."""
+        words = _words(query)
+        presence = np.zeros(VECTOR_DIM, dtype=np.float32)
+        presence[list(_ngram_buckets([_canonical(w) for w in words]))] = 1.0
+
+        with self.lock:
+            if self.size == 0:
+                return None, 0.0
+
+            scores = self.matrix[:self.size] @ presence
+            k = min(self.candidates, self.size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            best = float(scores[top[0]])
+            for row in top:
+                score = float(scores[row])
+                if score < self.threshold:
+                    break
+                plan = self._fill(self.entries[row], words)
+                if plan is not None:
+                    self.last_used[row] = time.monotonic()
+                    return plan, score
+            return None, best
+
+    def _fill(self, entry, words):
+        carrier = entry["carrier"]
+        # N-grams only say the words look alike: "youtubers" is not "youtube"
+        tokens = {_canonical(w) for w in words}
+        if not all(w in tokens for w in carrier if w not in GENERIC_VERBS):
+            return None
+
+        extra = [i for i, w in enumerate(words)
+                 if _canonical(w) not in carrier and _canonical(w) not in GRAMMAR_WORDS]
+
+        if not entry["templates"]:
+            # No slot to put new words into, so any new word means a different request
+            return copy.deepcopy(entry["plan"]) if not extra else None
+
+        if not extra:
+            return None
+
+        # The slot must be one unbroken phrase of new words (grammar words allowed inside)
+        slot_words = words[extra[0]:extra[-1] + 1]
+        if not all(_can_be_slot(w) or _canonical(w) in GRAMMAR_WORDS for w in slot_words):
+            return None
+        if not all(_can_be_slot(words[i]) for i in extra):
+            return None
+
+        plan = copy.deepcopy(entry["plan"])
+        for step_index, field, template, sep in entry["templates"]:
+            if sep == " ":
+                value = " ".join(slot_words)
+            else:
+                value = sep.join(quote(w) for w in slot_words)
+            plan["steps"][step_index][field] = template.replace(SLOT_MARK, value)
+        return plan
+
+    def clear(self):
+        with self.lock:
+            self.matrix[:] = 0
+            self.last_used[:] = 0
+            self.doc_freq[:] = 0
+            self.entries = [None] * self.max_entries
+            self.size = 0
+
+
+if __name__ == "__main__":
+    # Benchmark: lookup latency with a full index
+    import random
+
+    topics = ["lofi", "jazz", "tech news", "cats", "cooking", "chess", "python", "football", "rain sounds"]
+    verbs = ["search youtube for", "look up", "find", "play", "google", "search amazon for"]
+
+    for n in (10_000, 100_000):
+        cache = PlanCache(max_entries=n)
+        rng = random.Random(0)
+        t0 = time.perf_counter()
+        for i in range(n):
+            q = f"{rng.choice(verbs)} {rng.choice(topics)} {i}"
+            cache.add(q, {"steps": [{"action": "OPEN_URL", "url": f"https://www.google.com/search?q={i}"}]})
+        fill_time = time.perf_counter() - t0
+
+        queries = [f"{rng.choice(verbs)} {rng.choice(topics)}" for _ in range(200)]
+        t0 = time.perf_counter()
+        for q in queries:
+            cache.lookup(q)
+        per_lookup = (time.perf_counter() - t0) / len(queries) * 1000
+        print(f"{n:>7} entries: fill {fill_time:.1f}s, lookup {per_lookup:.2f} ms")
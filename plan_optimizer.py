@@ -0,0 +1,135 @@
+import os
+
+# --- CONFIGURATION ---
+WAIT_MIN = float(os.environ.get("WINVOICE_WAIT_MIN", 0.5))
+WAIT_MAX = float(os.environ.get("WINVOICE_WAIT_MAX", 8))
+URL_SETTLE = float(os.environ.get("WINVOICE_URL_SETTLE", 3))  # Browser window up before the Start menu is used
+
+LAUNCH_ACTIONS = ("OPEN_URL", "OPEN_APP")
+FOCUS_ACTIONS = ("TYPE", "PRESS")  # Steps that act on whatever window has focus
+
+
+def _seconds(step):
+    try:
+        return max(0.0, float(step.get("seconds", 1)))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def _target(step):
+    return step.get("url") if step.get("action") == "OPEN_URL" else step.get("app")
+
+
+def _segments(steps):
+    """Splits a plan into [launch, steps that follow it...] groups."""
+    segments = [[]]
+    for step in steps:
+        if step.get("action") in LAUNCH_ACTIONS and segments[-1]:
+            segments.append([])
+        segments[-1].append(step)
+    return [s for s in segments if s]
+
+
+def _needs_focus(segment):
+    return any(s.get("action") in FOCUS_ACTIONS for s in segment)
+
+
+def _is_launch(segment):
+    return segment[0].get("action") in LAUNCH_ACTIONS
+
+
+def _is_independent_url(segment):
+    return segment[0].get("action") == "OPEN_URL" and not _needs_focus(segment)
+
+
+def _can_jump(segment):
+    """Whether an independent URL may be moved ahead of this group (an OPEN_APP nothing types into)."""
+    return (_is_launch(segment) and not _needs_focus(segment)
+            and not _is_independent_url(segment))  # Keep URLs in their own order
+
+
+def optimize_plan(plan, min_wait=WAIT_MIN, max_wait=WAIT_MAX):
+    """
+    Peephole pass over a routed plan. Removes time the prompt makes the model
+    waste, without changing what ends up happening. Returns a new plan.
+    """
+    steps = (plan or {}).get("steps")
+    if not steps:
+        return plan
+
+    log = []
+    before = sum(_seconds(s) for s in steps if s.get("action") == "WAIT")
+    segments = _segments([dict(s) for s in steps])
+
+    # 1. DUPLICATE OPENS (a repeat launch that nothing types into)
+    seen = set()
+    kept = []
+    for segment in segments:
+        if _is_launch(segment):
+            key = (segment[0]["action"], _target(segment[0]))
+            if key in seen and not _needs_focus(segment):
+                log.append(f"dropped duplicate {key[0]} {key[1]}")
+                continue
+            seen.add(key)
+        kept.append(segment)
+    segments = kept
+
+    # 2. INDEPENDENT LAUNCHES EARLIER (a URL nothing types into can load in the background)
+    # It only moves past groups that never touch the screen or focus: a browser
+    # opening before a screenshot or a paste would land in it. What it jumps is
+    # always a Start-menu OPEN_APP (Win, type the name, Enter), so the moved URL
+    # gets a settle WAIT: the browser must not grab focus while the name is typed.
+    ordered = []
+    for segment in segments:
+        position = len(ordered)
+        if _is_independent_url(segment):
+            while position > 0 and _can_jump(ordered[position - 1]):
+                position -= 1
+            if position < len(ordered):
+                log.append(f"moved {segment[0]['url']} earlier")
+                if segment[-1].get("action") == "WAIT":
+                    segment[-1]["seconds"] = max(_seconds(segment[-1]), URL_SETTLE)
+                else:
+                    segment.append({"action": "WAIT", "seconds": URL_SETTLE})
+        ordered.insert(position, segment)
+    segments = ordered
+
+    steps = [step for segment in segments for step in segment]
+
+    # 3. MERGE BACK-TO-BACK WAITS
+    merged = []
+    for step in steps:
+        if step.get("action") == "WAIT" and merged and merged[-1].get("action") == "WAIT":
+            merged[-1]["seconds"] = _seconds(merged[-1]) + _seconds(step)
+            log.append("merged consecutive WAITs")
+            continue
+        merged.append(step)
+    steps = merged
+
+    # 4. DROP WAITS NOTHING DEPENDS ON (end of plan, or the next step is a URL open)
+    kept = []
+    for i, step in enumerate(steps):
+        if step.get("action") == "WAIT":
+            following = steps[i + 1] if i + 1 < len(steps) else None
+            if following is None or following.get("action") == "OPEN_URL":
+                log.append(f"dropped WAIT {_seconds(step):g}s before {following['action'] if following else 'end'}")
+                continue
+        kept.append(step)
+    steps = kept
+
+    # 5. CLAMP WAITS
+    for step in steps:
+        if step.get("action") == "WAIT":
+            seconds = _seconds(step)
+            clamped = min(max(seconds, min_wait), max_wait)
+            if clamped != seconds:
+                log.append(f"clamped WAIT {seconds:g}s -> {clamped:g}s")
+                step["seconds"] = clamped
+
+    after = sum(_seconds(s) for s in steps if s.get("action") == "WAIT")
+    if log:
+        for entry in log:
+            print(f"   ✂️ Optimizer: {entry}")
+        print(f"   ✂️ Optimizer saved {before - after:.1f}s of waiting")
+
+    return {**plan, "steps": steps}
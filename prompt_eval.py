@@ -0,0 +1,71 @@
+import sys
+import time
+
+from ai_backend import generate_text, parse_response, PLAN_FORMAT
+from router import full_prompt, build_prompt, estimate_tokens
+
+# Offline check that the assembled prompt plans as well as the full one.
+# Each case lists the expected action sequence plus values that must appear in the plan.
+CASES = [
+    ("open paint", ["OPEN_APP", "WAIT"], ["mspaint"]),
+    ("open notepad", ["OPEN_APP", "WAIT"], ["notepad"]),
+    ("open wifi settings", ["OPEN_URL"], ["ms-settings:network-wifi"]),
+    ("check for windows updates", ["OPEN_URL"], ["ms-settings:windowsupdate"]),
+    ("search youtube for lofi beats", ["OPEN_URL"], ["youtube.com/results", "lofi"]),
+    ("search for weather in delhi", ["OPEN_URL"], ["google.com/search", "weather"]),
+    ("find headphones on amazon", ["OPEN_URL"], ["amazon.in/s?k=", "headphones"]),
+    ("take a screenshot", ["PRESS"], ["printscreen"]),
+    ("ask chatgpt how to boil an egg", ["OPEN_URL", "WAIT", "TYPE", "PRESS"], ["chatgpt.com", "egg"]),
+    ("open calculator and then open notepad and type hi",
+     ["OPEN_APP", "WAIT", "OPEN_APP", "WAIT", "TYPE"], ["calc", "notepad", "hi"]),
+    ("convert word to pdf", ["OPEN_URL"], ["ilovepdf.com"]),
+    ("play arijit singh on spotify", ["OPEN_URL"], ["open.spotify.com/search", "arijit"]),
+]
+
+
+def is_correct(plan, actions, values):
+    steps = plan.get("steps") if plan else None
+    if not steps:
+        return False
+    if [s.get("action") for s in steps] != actions:
+        return False
+    flat = " ".join(str(v) for s in steps for v in s.values()).lower()
+    return all(v.lower() in flat for v in values)
+
+
+def evaluate(name, make_prompt, plan_format=PLAN_FORMAT):
+    correct, latency, tokens, output_tokens = 0, 0.0, 0, 0
+    for query, actions, values in CASES:
+        prompt = make_prompt(query)
+        tokens += estimate_tokens(prompt)
+        start = time.time()
+        try:
+            text = generate_text(prompt)
+            latency += time.time() - start
+            output_tokens += estimate_tokens(text)
+            plan = parse_response(text, plan_format)
+        except Exception as e:
+            latency += time.time() - start
+            plan = {"error": str(e)}
+        ok = is_correct(plan, actions, values)
+        correct += ok
+        if not ok:
+            print(f"   ✗ [{name}] {query}: {plan}")
+
+    n = len(CASES)
+    print(f"{name:>16}: accuracy {correct}/{n}, avg latency {latency / n:.2f}s, "
+          f"avg prompt ~{tokens // n} tokens, avg output ~{output_tokens // n} tokens")
+
+
+if __name__ == "__main__":
+    # python prompt_eval.py [k]            full vs assembled prompt
+    # python prompt_eval.py formats [k]    JSON vs compact plan output
+    args = sys.argv[1:]
+    if args and args[0] == "formats":
+        k = int(args[1]) if len(args) > 1 else 3
+        for fmt in ("json", "compact"):
+            evaluate(f"{fmt} output", lambda q: build_prompt(q, k=k, plan_format=fmt), fmt)
+    else:
+        k = int(args[0]) if args else 3
+        evaluate("full", lambda q: full_prompt(PLAN_FORMAT) + f"\nUser: {q}\nOutput:")
+        evaluate("assembled", lambda q: build_prompt(q, k=k))
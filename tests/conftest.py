@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Tests import the flat top-level modules directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# ai_backend builds its client at import time; tests never reach the real API
+os.environ.setdefault("GOOGLE_API_KEY", "test")
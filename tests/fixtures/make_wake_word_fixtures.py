@@ -0,0 +1,92 @@
+import os
+import wave
+
+import numpy as np
+
+# Regenerates the synthetic wake-word fixtures:  python tests/fixtures/make_wake_word_fixtures.py
+# The "wake word" is a fixed three-syllable voiced pattern (pitch contour + formants).
+# Positives are that pattern with a different speed, pitch, loudness and noise.
+# Negatives are other syllable patterns, babble and plain noise.
+RATE = 16000
+OUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wake_word")
+
+# (duration s, start pitch Hz, end pitch Hz, formant 1 Hz, formant 2 Hz)
+WAKE_WORD = [(0.22, 180, 210, 700, 1200), (0.18, 210, 170, 350, 2300), (0.30, 170, 120, 500, 900)]
+
+
+def syllable(duration, f0_start, f0_end, f1, f2):
+    t = np.arange(int(RATE * duration)) / RATE
+    f0 = np.linspace(f0_start, f0_end, len(t))
+    phase = 2 * np.pi * np.cumsum(f0) / RATE
+    voiced = np.zeros(len(t))
+    for h in range(1, 30):
+        freq = f0 * h
+        # Harmonics near the formants are loudest: a crude vowel
+        gain = np.exp(-((freq - f1) / 150) ** 2) + 0.7 * np.exp(-((freq - f2) / 200) ** 2) + 0.02
+        voiced += gain * np.sin(h * phase)
+    envelope = np.sin(np.pi * np.linspace(0, 1, len(t))) ** 0.5
+    return voiced * envelope
+
+
+def utterance(pattern, speed=1.0, pitch=1.0, gap=0.04):
+    parts = []
+    for duration, f0a, f0b, f1, f2 in pattern:
+        parts.append(syllable(duration / speed, f0a * pitch, f0b * pitch, f1, f2))
+        parts.append(np.zeros(int(RATE * gap / speed)))
+    audio = np.concatenate(parts)
+    return audio / np.abs(audio).max()
+
+
+def random_pattern(rng, syllables=3):
+    return [(rng.uniform(0.15, 0.3), rng.uniform(100, 250), rng.uniform(100, 250),
+             rng.uniform(300, 900), rng.uniform(900, 2600)) for _ in range(syllables)]
+
+
+def with_noise(audio, rng, amplitude, noise, seconds_before=0.6, seconds_after=0.8):
+    before = np.zeros(int(RATE * seconds_before))
+    after = np.zeros(int(RATE * seconds_after))
+    out = np.concatenate([before, audio * amplitude, after])
+    return out + rng.normal(0, noise, len(out))
+
+
+def write(path, audio):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(np.clip(audio, -32768, 32767).astype(np.int16).tobytes())
+
+
+def main():
+    rng = np.random.default_rng(1234)
+
+    # Enrolment: three clean-ish takes
+    for i, (speed, pitch) in enumerate([(1.0, 1.0), (0.95, 1.03), (1.05, 0.97)]):
+        audio = utterance(WAKE_WORD, speed, pitch) * 6000
+        audio += rng.normal(0, 30, len(audio))
+        write(os.path.join(OUT_DIR, "templates", f"template_{i}.wav"), audio)
+
+    # Positives: each in a short clip with room noise
+    for i in range(6):
+        speed, pitch = rng.uniform(0.9, 1.1), rng.uniform(0.95, 1.05)
+        audio = utterance(WAKE_WORD, speed, pitch)
+        write(os.path.join(OUT_DIR, "positive", f"positive_{i}.wav"),
+              with_noise(audio, rng, rng.uniform(3000, 8000), 60))
+
+    # Negatives: other "words" back to back, babble, and plain noise
+    for i in range(3):
+        words = [utterance(random_pattern(rng, int(rng.integers(2, 5)))) * rng.uniform(3000, 8000)
+                 for _ in range(5)]
+        gaps = [np.zeros(int(RATE * rng.uniform(0.2, 0.6))) for _ in words]
+        audio = np.concatenate([x for pair in zip(words, gaps) for x in pair])
+        write(os.path.join(OUT_DIR, "negative", f"other_words_{i}.wav"), audio + rng.normal(0, 60, len(audio)))
+
+    babble = sum(np.concatenate([utterance(random_pattern(rng)) for _ in range(8)])[:RATE * 4]
+                 for _ in range(3)) * 2500
+    write(os.path.join(OUT_DIR, "negative", "babble.wav"), babble + rng.normal(0, 60, len(babble)))
+    write(os.path.join(OUT_DIR, "negative", "noise.wav"), rng.normal(0, 2000, RATE * 4))
+
+
+if __name__ == "__main__":
+    main()
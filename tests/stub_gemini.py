@@ -0,0 +1,66 @@
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the Gemini API. Point the app at it with GEMINI_BASE_URL.
+#   python tests/stub_gemini.py 8765 3    -> answers 429 to the first 3 requests
+PLAN_TEXT = '{"steps": [{"action": "WAIT", "seconds": 1}]}'
+
+
+class StubGemini(ThreadingHTTPServer):
+    """Answers generateContent with PLAN_TEXT, or 429 while `fail_first` requests remain."""
+    daemon_threads = True
+
+    def __init__(self, port=0, fail_first=0, delay=0.0, status=429):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.fail_first = fail_first
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failing = server.requests <= server.fail_first
+        time.sleep(server.delay)
+
+        if failing:
+            self.send_response(server.status)
+            body = {"error": {"code": server.status, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}}
+        else:
+            self.send_response(200)
+            body = {"candidates": [{"content": {"parts": [{"text": PLAN_TEXT}], "role": "model"}}]}
+        data = json.dumps(body).encode()
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    fail_first = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    print(f"Stub Gemini on http://127.0.0.1:{port} (first {fail_first} requests get 429)")
+    StubGemini(port, fail_first).serve_forever()
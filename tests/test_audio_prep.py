@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from audio_prep import TARGET_RATE, TRIM_MARGIN_MS, prepare, resample, trim_silence
+
+
+def speech(rate, silence=0.5, tone=0.5, amplitude=5000):
+    """Silence, a 440 Hz tone, silence: the tone stands in for speech."""
+    t = np.arange(int(rate * tone)) / rate
+    quiet = np.zeros(int(rate * silence), dtype=np.float32)
+    return np.concatenate([quiet, (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32), quiet])
+
+
+def test_trim_keeps_the_margin_around_speech():
+    rate = 16000
+    trimmed = trim_silence(speech(rate), rate)
+    margin = int(rate * TRIM_MARGIN_MS / 1000)
+    assert len(trimmed) == int(rate * 0.5) + 2 * margin
+    assert np.all(trimmed[:margin] == 0) and np.all(trimmed[-margin:] == 0)
+    assert np.any(trimmed[margin:margin + 100] != 0)  # Speech starts right after the margin
+
+
+def test_trim_leaves_all_silence_alone():
+    quiet = np.zeros(16000, dtype=np.float32)
+    assert len(trim_silence(quiet, 16000)) == len(quiet)
+
+
+@pytest.mark.parametrize("rate", [44100, 48000])
+def test_resample_to_16k(rate):
+    samples = speech(rate, silence=0, tone=1.0)
+    out = resample(samples, rate)
+    assert out.dtype == np.float32
+    assert len(out) == TARGET_RATE
+    # The 440 Hz tone survives the low-pass at about the same level
+    assert abs(np.sqrt(np.mean(out[1000:-1000] ** 2)) - 5000 / np.sqrt(2)) < 100
+
+
+def test_prepare_reports_byte_sizes():
+    rate = 48000
+    raw = speech(rate).astype(np.int16).tobytes()
+    out, out_rate, out_width, stats = prepare(raw, rate, 2)
+
+    kept = 0.5 + 2 * TRIM_MARGIN_MS / 1000
+    assert (out_rate, out_width) == (TARGET_RATE, 2)
+    assert stats["bytes_before"] == len(raw) == int(1.5 * rate) * 2
+    assert stats["bytes_after"] == len(out) == int(kept * TARGET_RATE) * 2
+    assert stats["prep_time"] >= 0
+
+
+@pytest.mark.parametrize("width", [1, 3, 4])
+def test_prepare_passes_other_widths_through(width):
+    raw = bytes(range(256)) * width * 10
+    assert prepare(raw, 44100, width) == (raw, 44100, width, {
+        "bytes_before": len(raw), "bytes_after": len(raw), "prep_time": 0.0})
@@ -0,0 +1,45 @@
+import pytest
+
+import backends
+
+
+class BrokenBackend(backends.ActionBackend):
+    name = "broken"
+
+    def __init__(self):
+        raise OSError("no device")
+
+
+@pytest.fixture
+def broken(monkeypatch):
+    monkeypatch.setitem(backends.BACKENDS, "broken", BrokenBackend)
+    monkeypatch.setattr(backends, "PyAutoGuiBackend", backends.DryRunBackend)  # Never touch the display
+
+
+def test_named_backend_that_fails_raises(broken):
+    with pytest.raises(RuntimeError, match="no device"):
+        backends.create_backend("broken")
+    with pytest.raises(RuntimeError, match="Unknown backend"):
+        backends.create_backend("nope")
+
+
+def test_backend_from_environment_that_fails_raises(broken, monkeypatch):
+    monkeypatch.setattr(backends, "DEFAULT_BACKEND", "broken")
+    monkeypatch.setattr(backends, "BACKEND_CHOSEN", True)
+    with pytest.raises(RuntimeError):
+        backends.create_backend()
+
+
+def test_implicit_default_falls_back(broken, monkeypatch):
+    monkeypatch.setattr(backends, "DEFAULT_BACKEND", "broken")
+    monkeypatch.setattr(backends, "BACKEND_CHOSEN", False)
+    assert isinstance(backends.create_backend(), backends.DryRunBackend)
+
+
+def test_batch_refuses_a_backend_that_cannot_start(broken, monkeypatch, tmp_path):
+    import batch
+
+    commands = tmp_path / "commands.txt"
+    commands.write_text("open paint\n", encoding="utf-8")
+    with pytest.raises(SystemExit, match="broken"):
+        batch.main([str(commands), "--execute", "--backend", "broken", "-o", str(tmp_path / "out.jsonl")])
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from google import genai
+
+import ai_backend
+import batch
+import router
+from stub_gemini import StubGemini
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubGemini().start()
+    monkeypatch.setattr(ai_backend, "client", genai.Client(api_key="test", http_options={"base_url": server.url}))
+    monkeypatch.setattr(ai_backend, "governor", ai_backend.RequestGovernor(per_minute=600))
+    monkeypatch.setattr(router, "USE_PLAN_CACHE", True)
+    router.plan_cache.clear()
+    yield server
+    server.stop()
+    router.plan_cache.clear()
+
+
+def run_batch(tmp_path, commands, *args):
+    source = tmp_path / "commands.txt"
+    source.write_text("\n".join(commands) + "\n# a comment\n", encoding="utf-8")
+    output = tmp_path / "plans.jsonl"
+    code = batch.main([str(source), "-o", str(output), "-c", "1", *args])
+    return code, [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_streams_one_result_per_command(stub, tmp_path):
+    code, results = run_batch(tmp_path, ["open notepad", "open calculator"], "--execute")
+    assert code == 0
+    assert sorted(r["index"] for r in results) == [1, 2]
+    assert all(r["plan"] == {"steps": [{"action": "WAIT", "seconds": 1}]} and "route_ms" in r for r in results)
+
+
+def test_no_cache_sends_every_command_to_the_model(stub, tmp_path):
+    run_batch(tmp_path, ["open notepad", "open notepad"])
+    assert stub.requests == 1  # The repeat came from the plan cache
+
+    stub.requests = 0
+    run_batch(tmp_path, ["open notepad", "open notepad"], "--no-cache")
+    assert stub.requests == 2
+
+
+def test_profile_covers_a_headless_run(stub, tmp_path, monkeypatch):
+    import diagnostics
+
+    monkeypatch.setattr(diagnostics, "DIAG_DIR", str(tmp_path / "diagnostics"))
+    diagnostics.profiler.start()  # What WINVOICE_PROFILE=1 does on import
+    run_batch(tmp_path, ["open notepad"])
+    assert not diagnostics.profiler.running
+    assert any(p.name.startswith("profile_") for p in (tmp_path / "diagnostics").iterdir())
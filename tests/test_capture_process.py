@@ -0,0 +1,46 @@
+from multiprocessing import shared_memory
+
+import capture_process
+from capture_process import CaptureProcess, RingBuffer
+
+
+class FakeConn:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append(msg)
+
+    def poll(self, timeout=0):
+        return bool(self.replies)
+
+    def recv(self):
+        return self.replies.pop(0)
+
+
+def test_late_reply_to_a_timed_out_take_is_dropped():
+    shm = shared_memory.SharedMemory(create=True, size=capture_process._HEADER + 64)
+    try:
+        cap = CaptureProcess()
+        cap.ring = RingBuffer(shm, 64)
+        cap.requests = 1  # Take 1 timed out; its reply arrives during take 2
+        cap.conn = FakeConn([("utterance", 1, 0, 4, 0), ("utterance", 2, 4, 10, 0)])
+
+        assert len(cap.record(timeout=1)) == 6
+        assert cap.conn.sent == [("start", 2)]
+        cap.ring = None
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_ring_is_sized_from_the_device_rate():
+    cap = CaptureProcess(source_spec=("synthetic", (96000, 256, 4)), chunk_frames=256)
+    cap.start()
+    try:
+        assert cap.rate == 96000
+        assert cap.ring_size == capture_process.RING_SECONDS * 96000 * 2
+        assert len(cap.record(timeout=0.3)) > 0  # Stopped early, still answers its own take
+    finally:
+        cap.close()
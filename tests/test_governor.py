@@ -0,0 +1,125 @@
+import time
+import asyncio
+import threading
+
+import pytest
+from google import genai
+
+import ai_backend
+from stub_gemini import StubGemini
+
+PLAN = {"steps": [{"action": "WAIT", "seconds": 1}]}
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubGemini().start()
+    monkeypatch.setattr(ai_backend, "client", genai.Client(api_key="test", http_options={"base_url": server.url}))
+    monkeypatch.setattr(ai_backend, "BACKOFF_BASE", 0.05)
+    monkeypatch.setattr(ai_backend, "BACKOFF_MAX", 0.2)
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    governor = ai_backend.RequestGovernor(per_minute=600, deadline=5)
+    monkeypatch.setattr(ai_backend, "governor", governor)
+    return governor
+
+
+def test_retries_429_then_succeeds(stub, governor):
+    stub.fail_first = 2
+    assert ai_backend.call_gemini("open paint") == PLAN
+    assert stub.requests == 3
+    assert governor.metrics()["throttled"] == 2
+
+
+def test_gives_up_at_the_deadline(stub, governor):
+    stub.fail_first = 10_000
+    governor.deadline = 1.0
+    start = time.monotonic()
+    assert ai_backend.call_gemini("open paint") == {"error": "rate_limited"}
+    assert time.monotonic() - start < 2.0
+    assert governor.metrics()["failed"] == 1
+
+
+def test_identical_prompts_in_flight_share_one_call(stub, governor):
+    stub.delay = 0.3
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ai_backend.call_gemini("open paint")))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [PLAN] * 5
+    assert stub.requests == 1
+    assert governor.metrics()["coalesced"] == 4
+
+
+def test_identical_prompts_share_one_call_async(stub, governor):
+    stub.delay = 0.3
+
+    async def burst():
+        return await asyncio.gather(*(ai_backend.call_gemini_async("open paint") for _ in range(5)))
+
+    assert asyncio.run(burst()) == [PLAN] * 5
+    assert stub.requests == 1
+
+
+def test_rejected_callers_do_not_take_tokens():
+    governor = ai_backend.RequestGovernor(per_minute=60, deadline=2)  # 1/s, burst of 10
+    rejected = []
+
+    def call(i):
+        try:
+            governor.call(i, lambda: i)
+        except ai_backend.ThrottledError:
+            rejected.append(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert rejected
+    # Only accepted calls spent tokens: the queue is at most `deadline` seconds deep
+    assert governor.bucket.tokens > -3
+
+
+def test_cancelled_caller_does_not_cancel_the_others(stub, governor):
+    stub.delay = 0.3
+
+    async def run():
+        first = asyncio.create_task(ai_backend.call_gemini_async("open paint"))
+        second = asyncio.create_task(ai_backend.call_gemini_async("open paint"))
+        await asyncio.sleep(0.1)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == PLAN
+    assert stub.requests == 1
+
+
+def test_call_is_cancelled_when_every_caller_is(governor):
+    async def run():
+        gate = asyncio.Event()
+
+        async def slow():
+            gate.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(governor.call_async("k", slow))
+        await gate.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+        return governor.in_flight_async
+
+    assert asyncio.run(run()) == {}
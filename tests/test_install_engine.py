@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import base64
+import hashlib
+import zipfile
+import subprocess
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_wheel(wheelhouse, name="winvoice_fixture", version="1.0"):
+    """Writes a minimal pure-Python wheel by hand (no build backend needed)."""
+    dist_info = f"{name}-{version}.dist-info"
+    files = {
+        f"{name}.py": "VALUE = 42\n",
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n",
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nGenerator: tests\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = []
+    for path, content in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(content.encode()).digest()).rstrip(b"=").decode()
+        record.append(f"{path},sha256={digest},{len(content.encode())}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = "\n".join(record) + "\n"
+
+    path = os.path.join(wheelhouse, f"{name}-{version}-py3-none-any.whl")
+    with zipfile.ZipFile(path, "w") as whl:
+        for name_in_zip, content in files.items():
+            whl.writestr(name_in_zip, content)
+    return path
+
+
+RUN_ENGINE = """
+import json, sys
+from install_engine import InstallEngine
+messages = []
+engine = InstallEngine(requirements=sys.argv[2:], wheelhouse=sys.argv[1], offline=True,
+                       on_progress=lambda percent, message: messages.append(message))
+ok = engine.run()
+print("RESULT " + json.dumps({"ok": ok, "failed": engine.failed, "messages": messages}))
+"""
+
+
+@pytest.fixture(scope="module")
+def venv_python(tmp_path_factory):
+    venv = tmp_path_factory.mktemp("venv")
+    subprocess.run([sys.executable, "-m", "venv", str(venv)], check=True)
+    python = venv / ("Scripts/python.exe" if os.name == "nt" else "bin/python")
+    return str(python)
+
+
+def run_engine(python, wheelhouse, *requirements):
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR, PIP_NO_INPUT="1")
+    proc = subprocess.run([python, "-c", RUN_ENGINE, str(wheelhouse), *requirements],
+                          capture_output=True, text=True, env=env, timeout=300)
+    line = next(l for l in proc.stdout.splitlines() if l.startswith("RESULT "))
+    result = json.loads(line[len("RESULT "):])
+    return {"ok": result["ok"], "failed": result["failed"]}, result["messages"]
+
+
+def test_offline_install_noop_and_failure(venv_python, tmp_path):
+    wheelhouse = tmp_path / "wheelhouse"
+    wheelhouse.mkdir()
+    build_wheel(str(wheelhouse))
+
+    # 1. Installs from the local wheelhouse with no index
+    result, _ = run_engine(venv_python, wheelhouse, "winvoice_fixture==1.0")
+    assert result == {"ok": True, "failed": []}
+    subprocess.run([venv_python, "-c", "import winvoice_fixture; assert winvoice_fixture.VALUE == 42"], check=True)
+
+    # 2. Re-run is a no-op: pip is never started
+    result, messages = run_engine(venv_python, wheelhouse, "winvoice_fixture==1.0")
+    assert result == {"ok": True, "failed": []}
+    assert messages == ["All packages already installed."]
+
+    # 3. A package the wheelhouse can't provide is reported, the rest still installs
+    result, _ = run_engine(venv_python, wheelhouse, "winvoice_fixture", "winvoice-not-in-wheelhouse")
+    assert result == {"ok": False, "failed": ["winvoice-not-in-wheelhouse"]}
@@ -0,0 +1,59 @@
+from plan_cache import PlanCache
+
+
+def app_plan(app):
+    return {"steps": [{"action": "OPEN_APP", "app": app}, {"action": "WAIT", "seconds": 3}]}
+
+
+def url_plan(url):
+    return {"steps": [{"action": "OPEN_URL", "url": url}]}
+
+
+def test_app_names_are_never_slots():
+    cache = PlanCache()
+    cache.add("open paint", app_plan("mspaint"))
+    cache.add("open notepad", app_plan("notepad"))
+
+    for query in ("open word", "open netflix", "open bluetooth settings", "open calculator"):
+        plan, _ = cache.lookup(query)
+        assert plan is None, query
+
+    assert cache.lookup("open paint")[0] == app_plan("mspaint")
+
+
+def test_generic_verb_only_entries_are_not_stored():
+    cache = PlanCache()
+    cache.add("type hello", {"steps": [{"action": "TYPE", "text": "hello"}]})
+    assert cache.size == 0
+
+
+def test_search_slot_is_refilled():
+    cache = PlanCache()
+    cache.add("search youtube for lofi", url_plan("https://www.youtube.com/results?search_query=lofi"))
+
+    plan, score = cache.lookup("youtube lofi music")
+    assert plan == url_plan("https://www.youtube.com/results?search_query=lofi+music")
+    assert score >= cache.threshold
+
+    assert cache.lookup("search youtube for jazz")[0] == url_plan("https://www.youtube.com/results?search_query=jazz")
+    assert cache.lookup("play youtube lofi")[0] is None
+    assert cache.lookup("open youtube")[0] is None
+
+
+def test_slot_must_be_whole_tokens():
+    cache = PlanCache()
+    # "art" appears inside "start", but is not a token of the URL
+    cache.add("search google for art", url_plan("https://www.google.com/start?q=pictures"))
+    assert cache.entries[0]["templates"] == []
+
+
+def test_site_must_be_named_as_a_whole_word():
+    cache = PlanCache()
+    cache.add("search youtube for lofi", url_plan("https://www.youtube.com/results?search_query=lofi"))
+    cache.add("search amazon for shoes", url_plan("https://www.amazon.com/s?k=shoes"))
+    cache.add("search google for weather", url_plan("https://www.google.com/search?q=weather"))
+
+    for query in ("how much do youtubers earn", "amazonas rainforest", "googled results"):
+        assert cache.lookup(query)[0] is None, query
+
+    assert cache.lookup("amazon running shoes")[0] == url_plan("https://www.amazon.com/s?k=running+shoes")
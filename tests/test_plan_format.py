@@ -0,0 +1,44 @@
+import pytest
+
+import ai_backend
+from ai_backend import format_compact, parse_compact, parse_response
+from router import EXAMPLES, OUTPUT_RULES
+
+
+def test_json_is_the_default_format():
+    assert all(fmt == "json" for fmt in ai_backend.MODEL_FORMATS.values())
+
+
+def test_plan_format_setting_is_validated():
+    assert set(ai_backend.PLAN_FORMATS) == set(OUTPUT_RULES)
+    assert ai_backend._plan_format("Compact") == "compact"
+    assert ai_backend._plan_format(" JSON ") == "json"
+    assert ai_backend._plan_format("yaml") == "json"
+    assert ai_backend._plan_format(None) == ai_backend.MODEL_FORMATS.get(ai_backend.MODEL, "json")
+
+
+def test_compact_round_trips_every_example():
+    for example in EXAMPLES:
+        assert parse_compact(format_compact(example["plan"])) == example["plan"]
+
+
+def test_parse_compact():
+    text = "```\nU https://x.com\nW 3\nT a\\nb\nP ctrl+V\nA notepad\n```"
+    assert parse_compact(text) == {"steps": [
+        {"action": "OPEN_URL", "url": "https://x.com"},
+        {"action": "WAIT", "seconds": 3.0},
+        {"action": "TYPE", "text": "a\nb"},
+        {"action": "PRESS", "keys": ["ctrl", "v"]},
+        {"action": "OPEN_APP", "app": "notepad"},
+    ]}
+
+
+@pytest.mark.parametrize("text", ["Sure! Here you go", "U", "W soon", "X something", ""])
+def test_parse_compact_is_strict(text):
+    with pytest.raises(ValueError):
+        parse_compact(text)
+
+
+def test_compact_falls_back_to_json_replies():
+    assert parse_response('{"steps": [{"action": "WAIT", "seconds": 1}]}', "compact") == {
+        "steps": [{"action": "WAIT", "seconds": 1}]}
@@ -0,0 +1,68 @@
+from plan_optimizer import URL_SETTLE, optimize_plan
+
+
+def actions(plan):
+    return [(s["action"], s.get("url") or s.get("app") or s.get("text") or s.get("keys")) for s in plan["steps"]]
+
+
+def test_url_never_moves_before_a_screenshot():
+    plan = {"steps": [
+        {"action": "PRESS", "keys": ["win", "printscreen"]},
+        {"action": "OPEN_URL", "url": "https://youtube.com"},
+    ]}
+    assert actions(optimize_plan(plan)) == actions(plan)
+
+
+def test_url_never_moves_before_typing():
+    plan = {"steps": [
+        {"action": "OPEN_APP", "app": "notepad"},
+        {"action": "WAIT", "seconds": 3},
+        {"action": "TYPE", "text": "hello"},
+        {"action": "OPEN_URL", "url": "https://youtube.com"},
+    ]}
+    assert actions(optimize_plan(plan)) == actions(plan)
+
+
+def test_moved_url_settles_before_the_start_menu_is_used():
+    plan = {"steps": [
+        {"action": "OPEN_APP", "app": "calc"},
+        {"action": "WAIT", "seconds": 3},
+        {"action": "OPEN_APP", "app": "notepad"},
+        {"action": "WAIT", "seconds": 3},
+        {"action": "OPEN_URL", "url": "https://youtube.com"},
+    ]}
+    steps = optimize_plan(plan)["steps"]
+    assert [s["action"] for s in steps] == ["OPEN_URL", "WAIT", "OPEN_APP", "WAIT", "OPEN_APP"]
+    assert steps[0]["url"] == "https://youtube.com"
+    assert steps[1]["seconds"] >= URL_SETTLE  # Browser is up before "calc" is typed into Start
+
+
+def test_url_stops_at_a_focus_group():
+    plan = {"steps": [
+        {"action": "OPEN_APP", "app": "notepad"},
+        {"action": "WAIT", "seconds": 3},
+        {"action": "TYPE", "text": "hi"},
+        {"action": "OPEN_APP", "app": "calc"},
+        {"action": "WAIT", "seconds": 3},
+        {"action": "OPEN_URL", "url": "https://a.com"},
+        {"action": "OPEN_URL", "url": "https://b.com"},
+    ]}
+    assert [a for a, _ in actions(optimize_plan(plan))] == [
+        "OPEN_APP", "WAIT", "TYPE", "OPEN_URL", "OPEN_URL", "WAIT", "OPEN_APP"]
+    urls = [v for a, v in actions(optimize_plan(plan)) if a == "OPEN_URL"]
+    assert urls == ["https://a.com", "https://b.com"]
+
+
+def test_waits_are_merged_dropped_and_clamped():
+    plan = {"steps": [
+        {"action": "OPEN_APP", "app": "notepad"},
+        {"action": "WAIT", "seconds": 20},
+        {"action": "WAIT", "seconds": 5},
+        {"action": "TYPE", "text": "hi"},
+        {"action": "WAIT", "seconds": 2},
+    ]}
+    assert optimize_plan(plan, min_wait=0.5, max_wait=8)["steps"] == [
+        {"action": "OPEN_APP", "app": "notepad"},
+        {"action": "WAIT", "seconds": 8},
+        {"action": "TYPE", "text": "hi"},
+    ]
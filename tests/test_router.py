@@ -0,0 +1,34 @@
+from router import split_clauses
+
+
+def test_splits_independent_intents():
+    assert split_clauses("open YouTube and search tech news and also open notepad and type hello") == [
+        "open YouTube and search tech news", "open notepad and type hello"]
+    assert split_clauses("open paint and open calculator then take a screenshot") == [
+        "open paint", "open calculator", "take a screenshot"]
+    assert split_clauses("open wifi settings, also search for weather in delhi") == [
+        "open wifi settings", "search for weather in delhi"]
+
+
+def test_keeps_dependent_steps_together():
+    assert split_clauses("open notepad then type hello") is None
+    assert split_clauses("open spotify and play arijit singh") is None
+    assert split_clauses("search youtube for cats then play the first video") is None
+    assert split_clauses("open youtube then search lofi, also open calculator") == [
+        "open youtube and search lofi", "open calculator"]
+
+
+def test_navigation_stays_with_what_was_opened():
+    for query in ("open spotify then show my playlists", "open gmail then check my inbox",
+                  "open youtube then go to trending", "open settings then go to bluetooth",
+                  "open spotify and show my playlists", "open gmail, also check my inbox"):
+        assert split_clauses(query) is None, query
+    assert split_clauses("open youtube then go to trending, also open calculator") == [
+        "open youtube and go to trending", "open calculator"]
+
+
+def test_falls_back_when_ambiguous():
+    assert split_clauses("open notepad then save it") is None
+    assert split_clauses("open paint then open the first one") is None
+    assert split_clauses('open notepad and type "salt and pepper then stir"') is None
+    assert split_clauses("what is rock and roll then open notepad") is None
@@ -0,0 +1,29 @@
+import os
+
+import wake_word
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "wake_word")
+
+
+def test_false_reject_and_false_accept_rates():
+    reject_rate, false_accepts, minutes = wake_word.evaluate(
+        os.path.join(FIXTURES, "positive"), os.path.join(FIXTURES, "negative"), os.path.join(FIXTURES, "templates"))
+
+    assert minutes > 0.3
+    assert reject_rate <= 1 / 6
+    assert false_accepts == 0
+
+
+def test_detection_hands_over_the_audio_after_the_wake_word():
+    detector = wake_word.WakeWordDetector.from_directory(os.path.join(FIXTURES, "templates"))
+    samples = wake_word._read_wav(os.path.join(FIXTURES, "positive", "positive_0.wav"))
+
+    after = None
+    for start in range(0, len(samples), wake_word.CHUNK_FRAMES):
+        chunk = samples[start:start + wake_word.CHUNK_FRAMES].astype("int16").tobytes()
+        after = detector.process(chunk)
+        if after is not None:
+            break
+
+    assert after is not None
+    assert len(after) < wake_word.SAMPLE_RATE  # Only what arrived after the word, not the whole window
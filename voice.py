@@ -2,11 +2,21 @@ import speech_recognition as sr
 import pyttsx3
 import threading
 import time
+import os
+import asyncio
 import audioop  # Used for detecting silence manually
+import audio_prep
 
 # Global flag to control the listening loop
 _stop_signal = False
 
+# "process" moves the mic loop + VAD into its own process (see capture_process.py)
+CAPTURE_MODE = os.environ.get("WINVOICE_CAPTURE", "thread")
+# Trim silence + downsample to 16 kHz before upload ("0" sends the raw recording)
+AUDIO_PREP = os.environ.get("WINVOICE_AUDIO_PREP", "1") == "1"
+NORMALIZE_GAIN = os.environ.get("WINVOICE_NORMALIZE", "0") == "1"
+_capture = None
+
 # --- 1. SETUP MOUTH ---
 try:
     engine = pyttsx3.init()
@@ -34,6 +44,117 @@ def force_stop_listening():
     """Call this to immediately cut off the recording."""
     global _stop_signal
     _stop_signal = True
+    if _capture is not None:
+        _capture.force_stop()
+
+
+def shutdown():
+    """Stops the capture process, if one was started."""
+    global _capture
+    if _capture is not None and _capture.running:
+        _capture.close()
+    _capture = None
+
+
+def record_until_silence(read_chunk, energy_threshold, frames=None):
+    """
+    THE MANUAL RECORDING LOOP: reads chunks until 1.2s of silence after speech,
+    the safety timeout, or force_stop_listening(). `frames` lets a caller hand
+    over audio it already captured (e.g. right after the wake word).
+    """
+    frames = list(frames or [])
+    silence_start_time = None
+    has_speech_started = False
+    max_recording_time = 15  # Safety timeout
+    start_time = time.time()
+
+    while True:
+        # 1. CHECK FOR MANUAL STOP
+        if _stop_signal:
+            print("   🛑 Manual Stop Triggered.")
+            break
+
+        # 2. CHECK FOR MAX TIMEOUT
+        if (time.time() - start_time) > max_recording_time:
+            break
+
+        # 3. READ AUDIO CHUNK
+        # Read 4096 bytes (small chunk)
+        buffer = read_chunk()
+        if len(buffer) == 0: break
+        frames.append(buffer)
+
+        # 4. DETECT SILENCE (RMS Amplitude)
+        # We calculate how "loud" this chunk was
+        rms = audioop.rms(buffer, 2)  # width=2 for 16-bit audio
+
+        if rms > energy_threshold:
+            has_speech_started = True
+            silence_start_time = None  # Reset silence timer
+        else:
+            if has_speech_started:
+                if silence_start_time is None:
+                    silence_start_time = time.time()
+                # If silent for > 1.2 seconds, stop automatically
+                elif (time.time() - silence_start_time) > 1.2:
+                    print("   🤫 Auto-Stop (Silence).")
+                    break
+
+    return frames
+
+
+def transcribe(raw_data, sample_rate, sample_width, r=None):
+    r = r or sr.Recognizer()
+    if AUDIO_PREP:
+        raw_data, sample_rate, sample_width, stats = audio_prep.prepare(
+            raw_data, sample_rate, sample_width, normalize=NORMALIZE_GAIN)
+        print(f"   📦 Audio {stats['bytes_before'] // 1024} KB -> {stats['bytes_after'] // 1024} KB "
+              f"({stats['prep_time'] * 1000:.0f} ms)")
+
+    audio_data = sr.AudioData(raw_data, sample_rate, sample_width)
+    start = time.time()
+    try:
+        text = r.recognize_google(audio_data)
+        print(f"   🗣️  You said: '{text}'")
+        return text
+    except sr.UnknownValueError:
+        return ""
+    except sr.RequestError:
+        return ""
+    finally:
+        # recognize_google does the FLAC encode and the upload
+        print(f"   ⏱️ Encode + upload + recognize: {time.time() - start:.2f}s")
+
+
+def _listen_out_of_process():
+    global _capture
+    from capture_process import CaptureProcess
+
+    if _capture is None or not _capture.running:
+        _capture = CaptureProcess()
+        _capture.start()
+
+    print("\n   🎤 Listening (Capture Process)...")
+    pcm = _capture.record()
+    print("   ⏳ Processing...")
+    if not pcm:
+        return ""
+    if _capture.overflows:
+        print(f"   ⚠️ {_capture.overflows} audio buffers dropped so far")
+
+    return transcribe(bytes(pcm), _capture.rate, _capture.sample_width)
+
+
+def listen_from_stream(read_chunk, sample_rate, sample_width, energy_threshold, frames=None):
+    """Like listen(), but on a stream that is already open (the wake-word detector's)."""
+    global _stop_signal
+    _stop_signal = False
+
+    frames = record_until_silence(read_chunk, energy_threshold, frames)
+    print("   ⏳ Processing...")
+    if not frames: return ""
+
+    return transcribe(b"".join(frames), sample_rate, sample_width)
 
 
 def listen():
@@ -43,6 +164,12 @@ def listen():
     global _stop_signal
     _stop_signal = False  # Reset flag
 
+    if CAPTURE_MODE == "process":
+        try:
+            return _listen_out_of_process()
+        except OSError as e:
+            print(f"   ⚠️ Capture process unavailable ({e}), using in-process capture.")
+
     r = sr.Recognizer()
     r.energy_threshold = 300  # Sensitivity (Lower = more sensitive)
     r.dynamic_energy_threshold = True
@@ -58,60 +185,14 @@ def listen():
                 # Calibration (Short)
                 r.adjust_for_ambient_noise(source, duration=0.5)
 
-                frames = []
-                silence_start_time = None
-                has_speech_started = False
-                max_recording_time = 15  # Safety timeout
-                start_time = time.time()
-
-                # --- THE MANUAL RECORDING LOOP ---
-                while True:
-                    # 1. CHECK FOR MANUAL STOP
-                    if _stop_signal:
-                        print("   🛑 Manual Stop Triggered.")
-                        break
-
-                    # 2. CHECK FOR MAX TIMEOUT
-                    if (time.time() - start_time) > max_recording_time:
-                        break
-
-                    # 3. READ AUDIO CHUNK
-                    # Read 4096 bytes (small chunk)
-                    buffer = source.stream.read(4096)
-                    if len(buffer) == 0: break
-                    frames.append(buffer)
-
-                    # 4. DETECT SILENCE (RMS Amplitude)
-                    # We calculate how "loud" this chunk was
-                    rms = audioop.rms(buffer, 2)  # width=2 for 16-bit audio
-
-                    if rms > r.energy_threshold:
-                        has_speech_started = True
-                        silence_start_time = None  # Reset silence timer
-                    else:
-                        if has_speech_started:
-                            if silence_start_time is None:
-                                silence_start_time = time.time()
-                            # If silent for > 1.2 seconds, stop automatically
-                            elif (time.time() - silence_start_time) > 1.2:
-                                print("   🤫 Auto-Stop (Silence).")
-                                break
+                frames = record_until_silence(lambda: source.stream.read(4096), r.energy_threshold)
 
                 # --- PROCESS AUDIO ---
                 print("   ⏳ Processing...")
                 if not frames: return ""
 
                 raw_data = b"".join(frames)
-                audio_data = sr.AudioData(raw_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
-
-                try:
-                    text = r.recognize_google(audio_data)
-                    print(f"   🗣️  You said: '{text}'")
-                    return text
-                except sr.UnknownValueError:
-                    return ""
-                except sr.RequestError:
-                    return ""
+                return transcribe(raw_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH, r)
 
         except OSError:
             continue  # Try next mic
@@ -119,4 +200,13 @@ def listen():
             print(f"Error: {e}")
             continue
 
-    return ""
\ No newline at end of file
+    return ""
+
+
+async def listen_async():
+    """listen() for the asyncio pipeline. Cancelling it cuts the recording short."""
+    try:
+        return await asyncio.to_thread(listen)
+    except asyncio.CancelledError:
+        force_stop_listening()
+        raise
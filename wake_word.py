@@ -0,0 +1,321 @@
+import os
+import sys
+import glob
+import time
+import wave
+import threading
+from collections import deque
+
+import numpy as np
+
+import audio_prep
+
+# --- CONFIGURATION ---
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 1600  # 100 ms
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wake_templates")
+THRESHOLD = float(os.environ.get("WINVOICE_WAKE_THRESHOLD", 0)) or None  # None = calibrate from templates
+MIN_THRESHOLD = 0.3  # Per-frame distance; features are unit vectors, so distances fall in [0, 2]
+CHECK_INTERVAL = 0.2  # Seconds of audio between detector runs
+COOLDOWN = 1.5
+GATE_FACTOR = 3.0  # Detector only runs while the room is this much louder than its ambient level
+MIN_GATE_RMS = 200
+END_SLACK_FRAMES = 15  # The wake word may have ended up to 150 ms before the newest frame
+
+# Feature extraction: 25 ms frames, 10 ms hop, 26 log-mel bands -> 13 MFCCs
+FRAME_LEN = 400
+HOP = 160
+N_FFT = 512
+N_MELS = 26
+N_MFCC = 13
+
+
+# --- FEATURES ---
+def _mel_filterbank():
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(SAMPLE_RATE / 2), N_MELS + 2)
+    bins = np.floor((N_FFT + 1) * mel_to_hz(mels) / SAMPLE_RATE).astype(int)
+    bank = np.zeros((N_MELS, N_FFT // 2 + 1), dtype=np.float32)
+    for m in range(1, N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+_MEL_BANK = _mel_filterbank()
+_WINDOW = np.hamming(FRAME_LEN).astype(np.float32)
+_DCT = np.cos(np.pi / N_MELS * (np.arange(N_MELS) + 0.5)[None, :] * np.arange(N_MFCC)[:, None]).astype(np.float32)
+
+
+def mfcc(samples):
+    """
+    MFCCs 1..12 per frame, scaled to unit length. Dropping c0 and the length
+    makes frames comparable regardless of loudness, and unlike whole-sequence
+    mean removal it doesn't depend on what else is in the window.
+    """
+    if len(samples) < FRAME_LEN:
+        return np.zeros((0, N_MFCC - 1), dtype=np.float32)
+    n = 1 + (len(samples) - FRAME_LEN) // HOP
+    idx = np.arange(FRAME_LEN)[None, :] + HOP * np.arange(n)[:, None]
+    frames = samples[idx] * _WINDOW
+    power = np.abs(np.fft.rfft(frames, N_FFT)) ** 2
+    log_mel = np.log(power @ _MEL_BANK.T + 1e-6)
+    feats = (log_mel @ _DCT.T)[:, 1:]
+    return feats / (np.linalg.norm(feats, axis=1, keepdims=True) + 1e-6)
+
+
+def dtw_distance(template, window):
+    """
+    Subsequence DTW: the whole template against any stretch of the window that
+    ends near its newest frame. Slope-limited steps (1,1), (1,2), (2,1) mean
+    each template row only depends on earlier rows, so rows are vectorized.
+    Returns (distance per template frame, window frame where the match ends).
+    """
+    t, n = len(template), len(window)
+    if t < 2 or n < t // 2:
+        return np.inf, n
+    cost = np.sqrt(np.maximum(
+        (template ** 2).sum(1)[:, None] + (window ** 2).sum(1)[None, :] - 2 * template @ window.T, 0))
+
+    inf = np.full(2, np.inf, dtype=np.float32)
+    prev2 = np.full(n, np.inf, dtype=np.float32)
+    prev = cost[0].copy()  # Free start anywhere in the window
+    for i in range(1, t):
+        p = np.concatenate([inf, prev])
+        p2 = np.concatenate([inf, prev2])
+        best = np.minimum(np.minimum(p[1:-1], p[:-2]), p2[1:-1])  # (i-1,j-1), (i-1,j-2), (i-2,j-1)
+        prev2, prev = prev, cost[i] + best
+
+    tail = prev[max(0, n - END_SLACK_FRAMES):]
+    end = int(np.argmin(tail)) + max(0, n - END_SLACK_FRAMES)
+    return float(tail.min()) / t, end
+
+
+def _read_wav(path):
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2 or w.getnchannels() != 1:
+            raise ValueError(f"{path}: wake-word clips must be 16-bit mono")
+        rate = w.getframerate()
+        raw = w.readframes(w.getnframes())
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    return audio_prep.resample(samples, rate, SAMPLE_RATE)
+
+
+# --- DETECTOR ---
+class WakeWordDetector:
+    """Template matcher for "Hey WinVoice" on a continuous 16 kHz stream."""
+
+    def __init__(self, templates, threshold=THRESHOLD):
+        self.templates = [mfcc(audio_prep.trim_silence(t, SAMPLE_RATE)) for t in templates]
+        if not self.templates:
+            raise ValueError("No wake-word templates. Run 'python wake_word.py enroll' first.")
+        self.threshold = threshold or self._calibrate()
+
+        longest = max(len(t) for t in self.templates) * HOP + FRAME_LEN
+        self.window = deque(maxlen=int(longest * 1.3) // CHUNK_FRAMES + 2)  # chunks of float samples
+        self.ambient = None
+        self.since_check = 0
+        self.cooldown_until = 0.0
+        self.clock = 0.0  # Seconds of audio processed
+
+    @classmethod
+    def from_directory(cls, path=TEMPLATE_DIR, threshold=THRESHOLD):
+        return cls([_read_wav(p) for p in sorted(glob.glob(os.path.join(path, "*.wav")))], threshold)
+
+    def _calibrate(self):
+        """Accept anything closer than the enrolled clips are to each other, plus a margin."""
+        if len(self.templates) < 2:
+            return MIN_THRESHOLD
+        spread = [dtw_distance(a, b)[0] for a in self.templates for b in self.templates if a is not b]
+        return max(MIN_THRESHOLD, float(np.max(spread)) * 1.3)
+
+    def reset(self):
+        self.window.clear()
+        self.since_check = 0
+
+    def process(self, chunk):
+        """
+        Feeds one chunk of 16-bit PCM. Returns None, or the samples recorded after
+        the wake word ended (to seed the command recording) when it fires.
+        """
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        self.window.append(samples)
+        self.clock += len(samples) / SAMPLE_RATE
+        self.since_check += len(samples)
+
+        rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+        gate = max(MIN_GATE_RMS, (self.ambient or 0) * GATE_FACTOR)
+        if rms <= gate:
+            self.ambient = rms if self.ambient is None else self.ambient * 0.95 + rms * 0.05
+
+        # Cheap checks first: the detector only runs every CHECK_INTERVAL, while
+        # someone is actually making noise, and not right after a detection.
+        if self.since_check < CHECK_INTERVAL * SAMPLE_RATE or self.clock < self.cooldown_until:
+            return None
+        self.since_check = 0
+        if not any(np.sqrt(np.mean(c * c)) > gate for c in self.window):
+            return None
+
+        audio = np.concatenate(self.window)
+        feats = mfcc(audio)
+        best, end = min((dtw_distance(t, feats) for t in self.templates), key=lambda r: r[0])
+        if best > self.threshold:
+            return None
+
+        self.cooldown_until = self.clock + COOLDOWN
+        after = audio[min(len(audio), end * HOP + FRAME_LEN):]
+        self.reset()
+        return after
+
+
+# --- LISTENER ---
+class WakeWordListener(threading.Thread):
+    """
+    Keeps one 16 kHz mic stream open. When the wake word fires, the same stream
+    (plus the audio already buffered after the wake word) goes straight to the
+    command recorder, so there is no cold mic open.
+    """
+
+    def __init__(self, on_wake, on_command, device_index=None):
+        super().__init__(name="WakeWordListener", daemon=True)
+        self.detector = WakeWordDetector.from_directory()
+        self.on_wake = on_wake
+        self.on_command = on_command
+        self.device_index = device_index
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        import pyaudio
+        import voice
+
+        pa = pyaudio.PyAudio()
+        stream = pa.open(format=pyaudio.paInt16, channels=1, rate=SAMPLE_RATE, input=True,
+                         input_device_index=self.device_index, frames_per_buffer=CHUNK_FRAMES)
+
+        def read():
+            return stream.read(CHUNK_FRAMES, exception_on_overflow=False)
+
+        print("   👂 Wake word listener running.")
+        try:
+            while self.running:
+                after = self.detector.process(read())
+                if after is None:
+                    continue
+
+                print("   👂 Wake word detected.")
+                self.on_wake()
+                prefix = [np.clip(after, -32768, 32767).astype(np.int16).tobytes()] if len(after) else []
+                threshold = max(300, (self.detector.ambient or 0) * GATE_FACTOR)
+                text = voice.listen_from_stream(read, SAMPLE_RATE, 2, threshold, prefix)
+                self.on_command(text)
+        finally:
+            stream.stop_stream()
+            stream.close()
+            pa.terminate()
+
+
+# --- TOOLS ---
+def enroll(count=3, seconds=2.0):
+    import pyaudio
+
+    os.makedirs(TEMPLATE_DIR, exist_ok=True)
+    pa = pyaudio.PyAudio()
+    stream = pa.open(format=pyaudio.paInt16, channels=1, rate=SAMPLE_RATE, input=True,
+                     frames_per_buffer=CHUNK_FRAMES)
+    try:
+        for i in range(count):
+            input(f"[{i + 1}/{count}] Press Enter, then say 'Hey WinVoice'...")
+            raw = stream.read(int(SAMPLE_RATE * seconds), exception_on_overflow=False)
+            samples = audio_prep.trim_silence(np.frombuffer(raw, dtype=np.int16).astype(np.float32), SAMPLE_RATE)
+            path = os.path.join(TEMPLATE_DIR, f"template_{int(time.time())}_{i}.wav")
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(SAMPLE_RATE)
+                w.writeframes(samples.astype(np.int16).tobytes())
+            print(f"   Saved {path}")
+    finally:
+        stream.close()
+        pa.terminate()
+
+
+def _detections(detector, samples):
+    hits = 0
+    for start in range(0, len(samples), CHUNK_FRAMES):
+        chunk = samples[start:start + CHUNK_FRAMES].astype(np.int16).tobytes()
+        if detector.process(chunk) is not None:
+            hits += 1
+    return hits
+
+
+def evaluate(positive_dir, negative_dir, template_dir=TEMPLATE_DIR):
+    """
+    False-reject rate over clips that contain the wake word, false accepts over
+    clips that don't. Returns (false_reject_rate, false_accepts, minutes_of_negatives).
+    """
+    padding = np.zeros(int(SAMPLE_RATE * 0.5), dtype=np.float32)
+    positives = sorted(glob.glob(os.path.join(positive_dir, "*.wav")))
+    negatives = sorted(glob.glob(os.path.join(negative_dir, "*.wav")))
+
+    rejected = 0
+    for path in positives:
+        detector = WakeWordDetector.from_directory(template_dir)
+        if not _detections(detector, np.concatenate([padding, _read_wav(path), padding])):
+            rejected += 1
+            print(f"   missed: {path}")
+
+    accepts, hours = 0, 0.0
+    for path in negatives:
+        detector = WakeWordDetector.from_directory(template_dir)
+        samples = _read_wav(path)
+        hits = _detections(detector, samples)
+        accepts += hits
+        hours += len(samples) / SAMPLE_RATE / 3600
+        if hits:
+            print(f"   false accept x{hits}: {path}")
+
+    reject_rate = rejected / len(positives) if positives else 0.0
+    if positives:
+        print(f"False-reject rate: {rejected}/{len(positives)} ({reject_rate:.1%})")
+    if negatives:
+        print(f"False accepts: {accepts} in {hours * 60:.1f} min of audio ({accepts / max(hours, 1e-9):.1f}/hour)")
+    return reject_rate, accepts, hours * 60
+
+
+def benchmark(seconds=60):
+    """CPU cost per second of audio, against noise with speech-like bursts so the gate keeps opening."""
+    rng = np.random.default_rng(0)
+    template = np.sin(2 * np.pi * 220 * np.arange(int(SAMPLE_RATE * 0.8)) / SAMPLE_RATE) * 4000
+    detector = WakeWordDetector([template, template * 0.9], threshold=1e-9)  # Never fires, always does the work
+
+    samples = rng.normal(0, 50, SAMPLE_RATE * seconds).astype(np.float32)
+    for start in range(0, len(samples), SAMPLE_RATE * 3):  # 1 s burst every 3 s
+        burst = samples[start:start + SAMPLE_RATE]
+        burst += rng.normal(0, 3000, len(burst)).astype(np.float32)
+
+    cpu = time.process_time()
+    _detections(detector, samples)
+    used = time.process_time() - cpu
+    print(f"Wake word: {used:.2f}s CPU for {seconds}s of audio = {used / seconds:.1%} of one core")
+
+
+if __name__ == "__main__":
+    # python wake_word.py enroll | bench | eval <positives_dir> <negatives_dir> [templates_dir]
+    command = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if command == "enroll":
+        enroll()
+    elif command == "eval":
+        evaluate(*sys.argv[2:5])
+    else:
+        benchmark()